@@ -78,7 +78,7 @@ class AIModel:
         try:
             X = self.vectorizer.transform([text])
 
-            logger.info(f"X: {X}")
+            logger.debug("X: %s", X)
             # print("X", X)
             
             # Проверка на неизвестные слова
@@ -88,8 +88,8 @@ class AIModel:
             # Попробуем разбить текст на отдельные слова
             words = text.split()
             known_words = [w for w in words if w in self.vectorizer.vocabulary_]
-            logger.info(f"words: {words}")
-            logger.info(f"known_words: {known_words}")
+            logger.debug("words: %s", words)
+            logger.debug("known_words: %s", known_words)
             # print('words', words)
             # print('known_words', known_words)
             if not known_words:
@@ -98,7 +98,7 @@ class AIModel:
             # Собираем новый текст только из известных слов
             new_text = ' '.join(known_words)
             X = self.vectorizer.transform([new_text])
-            logger.info(f"X2: {X}")
+            logger.debug("X2: %s", X)
             # print('X2', X)
             if X.sum() == 0:
                 return "Не могу определить (неизвестные слова)"
@@ -0,0 +1,25 @@
+"""Общие функции нагрузочных тестов: временные пути бота и перцентили"""
+import os
+from core.config import config
+
+def redirect_paths(workdir: str):
+    """Направляет все файлы бота (модели, корпуса, FSM, лог) во временный каталог"""
+    data_dir = os.path.join(workdir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    config.MODEL_PATH = os.path.join(workdir, "saved_model")
+    config.TRAINING_DATA_PATH = os.path.join(data_dir, "training_data.json")
+    config.CHAT_DATA_PATH = os.path.join(data_dir, "chat_data.json")
+    config.TRAINING_JOURNAL_PATH = os.path.join(data_dir, "training_data.journal.jsonl")
+    config.CHAT_JOURNAL_PATH = os.path.join(data_dir, "chat_data.journal.jsonl")
+    config.CORPUS_DB_PATH = os.path.join(data_dir, "corpus.sqlite3")
+    config.FSM_DB_PATH = os.path.join(data_dir, "fsm.sqlite3")
+    config.LOG_FILE = os.path.join(workdir, "bot.log")
+    config.METRICS_PORT = 0
+    os.makedirs(config.MODEL_PATH, exist_ok=True)
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,241 @@
+"""Нагрузочный тест диспетчера без сети.
+
+Собирает настоящий ``Dispatcher`` со всеми роутерами (``bot.build_dispatcher``)
+и подает ему синтетические обновления через поддельную сессию бота: запросы к
+Bot API сериализуются как обычно, но вместо HTTP сразу получают успешный ответ.
+Корпус нужного размера генерируется и обучается во временном каталоге, данные
+бота не затрагиваются.
+
+Каждый пользователь проходит один сценарий (меню, режим вопросов, режим
+чата, добавление примеров администратором); одновременно активны
+``--concurrency`` пользователей. Печатается пропускная способность и
+p50/p95/p99 задержки по шагам сценариев, ``--json`` сохраняет результат
+для сравнения между версиями.
+
+    python benchmarks/dispatcher_bench.py --updates 5000 --concurrency 50 --corpus 2000 --json bench.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import config  # noqa: E402
+from benchmarks.common import percentile, redirect_paths  # noqa: E402
+
+ADMIN_BASE = 10 ** 9  # Пользователи сценариев администратора получают id от этого значения
+WORDS = [f"w{i}" for i in range(3000)]
+
+def make_corpus(size: int, labels: int, seed: int):
+    """Синтетические обучающие примеры и примеры чата"""
+    rng = random.Random(seed)
+    texts, answers = [], []
+    for i in range(size):
+        texts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))) + f" q{i}")
+        answers.append(f"метка {i % labels}")
+    chat = {f"фраза {i} " + " ".join(rng.choice(WORDS) for _ in range(4)): f"ответ {i}" for i in range(size)}
+    return {"texts": texts, "labels": answers}, chat
+
+def prepare_environment(workdir: str, corpus_size: int, labels: int, seed: int):
+    """Направляет все пути бота во временный каталог и пишет туда корпуса"""
+    redirect_paths(workdir)
+    config.ADMIN_IDS = range(ADMIN_BASE, ADMIN_BASE + 10 ** 6)
+    if not config.BOT_TOKEN:
+        config.BOT_TOKEN = "123456:BENCHMARK"
+
+    training, chat = make_corpus(corpus_size, labels, seed)
+    with open(config.TRAINING_DATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(training, f, ensure_ascii=False)
+    with open(config.CHAT_DATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(chat, f, ensure_ascii=False)
+    return training, chat
+
+def scenarios(training: dict, chat: dict, rng: random.Random) -> dict:
+    """Сценарий -> функция, возвращающая шаги (название шага, текст) для одного пользователя"""
+    questions = training["texts"]
+    phrases = list(chat)
+
+    def ask(items):
+        text = rng.choice(items)
+        # Половина запросов - точное совпадение, половина - перефразированный текст
+        return text if rng.random() < 0.5 else text + " " + rng.choice(WORDS)
+
+    return {
+        "menu": lambda: [("menu.start", "Старт"), ("menu.my_id", "Мой ID"), ("menu.other", "что-то непонятное")],
+        "prediction": lambda: [("prediction.enter", "Спросить")]
+        + [("prediction.ask", ask(questions)) for _ in range(3)] + [("prediction.exit", "Выход")],
+        "chat": lambda: [("chat.enter", "Общение")]
+        + [("chat.message", ask(phrases)) for _ in range(3)] + [("chat.exit", "Выход")],
+        "admin_add": lambda: [
+            ("admin.add", "Добавить"), ("admin.question", f"новый вопрос {rng.random()}"),
+            ("admin.answer", f"метка {rng.randint(0, 9)}"),
+            ("admin.chat_add", "Добавить (Чат)"), ("admin.chat_question", f"новая фраза {rng.random()}"),
+            ("admin.chat_answer", "новый ответ"),
+        ],
+    }
+
+async def run(args, training: dict, chat: dict) -> dict:
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.types import Update
+    from bot import build_dispatcher, create_bot
+    from core.outbox import outbox
+    from models.registry import registry
+    from models.training import trainer
+
+    class FakeSession(AiohttpSession):
+        """Сессия без сети: форма запроса собирается, ответ подставляется готовый"""
+
+        def __init__(self, api_latency: float):
+            super().__init__()
+            self.api_latency = api_latency
+            self.calls = 0
+
+        async def make_request(self, bot, method, timeout=None):
+            self.build_form_data(bot=bot, method=method)
+            self.calls += 1
+            if self.api_latency:
+                await asyncio.sleep(self.api_latency)
+            chat_id = getattr(method, "chat_id", 0) or 0
+            result = True
+            if method.__api_method__.startswith(("send", "edit")):
+                result = {"message_id": self.calls, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"}}
+            response = self.check_response(
+                bot=bot, method=method, status_code=200, content=json.dumps({"ok": True, "result": result})
+            )
+            return response.result
+
+        async def close(self):
+            pass
+
+    if not args.outbox_rate:
+        # Без лимитов Telegram замеряем сам бот, а не ведра очереди отправки
+        outbox.set_global_rate(1e9)
+        outbox.chat_rate = outbox.chat_burst = 1e9
+    else:
+        outbox.set_global_rate(args.outbox_rate)
+    session = FakeSession(args.api_latency_ms / 1000)
+    bot = create_bot(session)
+    dp = build_dispatcher()
+
+    started = time.perf_counter()
+    ok = registry.ai_model.train() and registry.chat_model.train()
+    registry.reload_ai_model()
+    registry.reload_chat_model()
+    registry.warm_up()
+    train_seconds = time.perf_counter() - started
+    if not ok:
+        raise RuntimeError("Не удалось обучить модели на синтетическом корпусе")
+
+    rng = random.Random(args.seed)
+    flows = scenarios(training, chat, rng)
+    latencies = {}
+    errors = 0
+    update_ids = itertools.count(1)
+    user_ids = itertools.count(1)
+    sent = 0
+
+    async def user():
+        nonlocal errors, sent
+        while sent < args.updates:
+            name = rng.choice(args.scenario)
+            user_id = next(user_ids) + (ADMIN_BASE if name == "admin_add" else 0)
+            for step, text in flows[name]():
+                if sent >= args.updates:
+                    return
+                sent += 1
+                update_id = next(update_ids)
+                update = Update.model_validate({
+                    "update_id": update_id,
+                    "message": {
+                        "message_id": update_id, "date": int(time.time()), "text": text,
+                        "chat": {"id": user_id, "type": "private"},
+                        "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+                    },
+                }, context={"bot": bot})
+                begin = time.perf_counter()
+                try:
+                    await dp.feed_update(bot, update)
+                except Exception:
+                    errors += 1
+                latencies.setdefault(step, []).append(time.perf_counter() - begin)
+
+    await dp.emit_startup(bot=bot)
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(args.concurrency)))
+        # Ответы уходят через очередь отправки - ждем, пока она опустеет
+        await outbox.drain(timeout=600)
+        elapsed = time.perf_counter() - started
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await dp.storage.close()
+        trainer.shutdown()
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "config": {
+            "updates": args.updates, "concurrency": args.concurrency, "corpus": args.corpus,
+            "labels": args.labels, "scenarios": args.scenario, "api_latency_ms": args.api_latency_ms,
+            "outbox_rate": args.outbox_rate, "ai_model_mode": config.AI_MODEL_MODE, "chat_engine": config.CHAT_ENGINE,
+            "fsm_storage": config.FSM_STORAGE, "seed": args.seed,
+        },
+        "train_seconds": round(train_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "updates_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        "api_calls": session.calls,
+        "errors": errors,
+        "paths": {
+            step: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                "max_ms": round(max(values) * 1000, 3),
+            }
+            for step, values in sorted(latencies.items())
+        },
+    }
+
+def print_report(result: dict):
+    cfg = result["config"]
+    print(f"Корпус {cfg['corpus']}, одновременно {cfg['concurrency']} пользователей, обучение {result['train_seconds']:.1f} с")
+    print(f"{sum(path['count'] for path in result['paths'].values())} обновлений за {result['elapsed_seconds']:.2f} с: "
+          f"{result['updates_per_second']:.0f} обновлений/с, ошибок {result['errors']}")
+    print(f"{'шаг':<22}{'кол-во':>8}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}{'max мс':>10}")
+    for step, path in result["paths"].items():
+        print(f"{step:<22}{path['count']:>8}{path['p50_ms']:>10.2f}{path['p95_ms']:>10.2f}"
+              f"{path['p99_ms']:>10.2f}{path['max_ms']:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--corpus", type=int, default=1000, help="Размер обучающего корпуса и корпуса чата")
+    parser.add_argument("--labels", type=int, default=50)
+    parser.add_argument("--scenario", action="append", choices=["menu", "prediction", "chat", "admin_add"],
+                        help="Сценарии (можно несколько раз, по умолчанию все)")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="Искусственная задержка ответа Bot API")
+    parser.add_argument("--outbox-rate", type=float, default=0.0, help="Общий лимит отправки в секунду (0 - без лимитов)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", help="Файл для результатов в JSON")
+    args = parser.parse_args()
+    args.scenario = args.scenario or ["menu", "prediction", "chat", "admin_add"]
+    config.LOG_LEVEL = args.log_level.upper()
+
+    with tempfile.TemporaryDirectory(prefix="dispatcher-bench-") as workdir:
+        training, chat = prepare_environment(workdir, args.corpus, args.labels, args.seed)
+        result = asyncio.run(run(args, training, chat))
+
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""Скорость предсказаний скомпилированного леса против sklearn.
+
+Обучает ``RandomForestClassifier`` на синтетическом корпусе (как в
+``model_scaling.py``), компилирует его в ``FlatForest`` и сравнивает на
+одних и тех же запросах:
+
+- одиночные запросы (как ``AIModel.predict``), p50 и p99;
+- пачки по ``--batch`` запросов (как ``predict_batch``).
+
+Перед замером проверяется, что метки, вероятности и номера листьев
+совпадают с sklearn побитно. Код возврата 1, если ускорение одиночного
+запроса по p50 меньше ``--min-speedup``.
+
+    python benchmarks/forest_bench.py --sizes 1000,10000 --json forest.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import config  # noqa: E402
+from benchmarks.common import percentile  # noqa: E402
+from benchmarks.model_scaling import make_corpus, paraphrase  # noqa: E402
+
+def timings(function, queries, batch: int = 1) -> list:
+    function(queries[0:batch])  # Прогрев
+    result = []
+    for start in range(0, queries.shape[0] - batch + 1, batch):
+        chunk = queries[start:start + batch]
+        started = time.perf_counter()
+        function(chunk)
+        result.append(time.perf_counter() - started)
+    return result
+
+def check_identical(forest, flat, queries):
+    """Метки, вероятности и листья скомпилированного леса совпадают с sklearn"""
+    import numpy as np
+
+    if not np.array_equal(forest.predict(queries), flat.predict(queries)):
+        raise AssertionError("Метки FlatForest отличаются от sklearn")
+    if not np.array_equal(forest.predict_proba(queries), flat.predict_proba(queries)):
+        raise AssertionError("Вероятности FlatForest отличаются от sklearn")
+    leaves = np.stack([tree.apply(queries.astype(np.float32)) for tree in forest.estimators_], axis=1)
+    if not np.array_equal(leaves + flat.roots, flat.apply(queries)):
+        raise AssertionError("Листья FlatForest отличаются от sklearn")
+
+def measure(size: int, args) -> dict:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from models.forest import FlatForest
+
+    texts, labels = make_corpus(size, args.label_ratio, args.vocabulary, args.seed)
+    vectorizer = TfidfVectorizer(lowercase=True)
+    X = vectorizer.fit_transform(texts)
+    started = time.perf_counter()
+    forest = RandomForestClassifier(random_state=args.seed).fit(X, labels)
+    fit_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    flat = FlatForest.from_sklearn(forest)
+    compile_seconds = time.perf_counter() - started
+    # Запросы: перефразированные примеры и несколько примеров корпуса как есть
+    queries = vectorizer.transform(paraphrase(texts, args.queries, args.seed + 1) + texts[:args.batch])
+    check_identical(forest, flat, queries)
+
+    result = {
+        "size": size,
+        "trees": len(forest.estimators_),
+        "nodes": len(flat.feature),
+        "max_depth": max(tree.tree_.max_depth for tree in forest.estimators_),
+        "fit_seconds": round(fit_seconds, 3),
+        "compile_ms": round(compile_seconds * 1000, 1),
+    }
+    for name, engine in (("sklearn", forest), ("flat", flat)):
+        single = timings(engine.predict, queries)
+        batch = timings(engine.predict, queries, args.batch)
+        result[f"{name}_single_p50_ms"] = round(percentile(single, 50) * 1000, 3)
+        result[f"{name}_single_p99_ms"] = round(percentile(single, 99) * 1000, 3)
+        result[f"{name}_batch_p50_ms"] = round(percentile(batch, 50) * 1000, 3)
+    result["single_speedup"] = round(result["sklearn_single_p50_ms"] / result["flat_single_p50_ms"], 1)
+    result["batch_speedup"] = round(result["sklearn_batch_p50_ms"] / result["flat_batch_p50_ms"], 1)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000", help="Размеры корпуса через запятую")
+    parser.add_argument("--label-ratio", type=float, default=0.02, help="Число меток на пример корпуса")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--batch", type=int, default=config.BATCH_MAX_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-speedup", type=float, default=5.0, help="Минимальное ускорение одиночного запроса")
+    parser.add_argument("--json", help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'примеров':>9}{'узлов':>9}{'глубина':>9}{'sklearn p50':>13}{'flat p50':>10}{'ускорение':>11}"
+          f"{'пачка sklearn':>15}{'пачка flat':>12}{'ускорение':>11}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        result = measure(size, args)
+        results.append(result)
+        print(f"{size:>9}{result['nodes']:>9}{result['max_depth']:>9}{result['sklearn_single_p50_ms']:>13.3f}"
+              f"{result['flat_single_p50_ms']:>10.3f}{result['single_speedup']:>10.1f}x"
+              f"{result['sklearn_batch_p50_ms']:>15.3f}{result['flat_batch_p50_ms']:>12.3f}{result['batch_speedup']:>10.1f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    slow = [result["size"] for result in results if result["single_speedup"] < args.min_speedup]
+    if slow:
+        print(f"Ускорение меньше {args.min_speedup:g}x для корпусов: {', '.join(map(str, slow))}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
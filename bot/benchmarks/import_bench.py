@@ -0,0 +1,147 @@
+"""Скорость массового импорта и выгрузки корпусов.
+
+Генерирует CSV или JSONL нужного размера (с долей повторов и битых
+строк), импортирует его через ``models.bulk.import_file`` - тот же путь,
+что у команд /import и /importchat, - и выгружает корпус обратно. Каждая
+комбинация хранилища (json, sqlite), корпуса и формата замеряется в
+отдельном процессе на пустом временном каталоге. После импорта корпус
+перечитывается с диска заново, чтобы убедиться, что все строки записаны.
+
+    python benchmarks/import_bench.py --rows 100000
+    python benchmarks/import_bench.py --rows 50000 --backends sqlite --kinds chat --formats csv
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import config  # noqa: E402
+from benchmarks.common import redirect_paths  # noqa: E402
+
+def make_file(path: str, fmt: str, kind: str, rows: int, duplicates: float, seed: int) -> int:
+    """Файл импорта: уникальные пары, повторы уже встреченных вопросов и немного битых строк"""
+    rng = random.Random(seed)
+    first, second = ('text', 'label') if kind == 'training' else ('question', 'answer')
+    unique = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        if writer:
+            writer.writerow((first, second))
+        for _ in range(rows):
+            if unique and rng.random() < duplicates:
+                question = f"вопрос {rng.randrange(unique)}"
+            elif rng.random() < 0.001:
+                question = ""  # Битая строка: пустой вопрос
+            else:
+                question = f"вопрос {unique}"
+                unique += 1
+            answer = f"ответ {rng.randrange(max(1, rows // 50))}"
+            if writer:
+                writer.writerow((question, answer))
+            else:
+                f.write(json.dumps({first: question, second: answer}, ensure_ascii=False) + '\n')
+    return unique
+
+def measure(backend: str, kind: str, fmt: str, args, workdir: str) -> dict:
+    redirect_paths(workdir)
+    config.LOG_FILE = ""
+    config.CORPUS_BACKEND = backend
+    path = os.path.join(workdir, f"import.{fmt}")
+    unique = make_file(path, fmt, kind, args.rows, args.duplicates, args.seed)
+    size = os.path.getsize(path)
+
+    from models import bulk
+    from models.corpus import ChatCorpus, TrainingCorpus
+    from models.registry import registry
+    # Модели создаются до замера: импорт sklearn не должен попасть во время импорта
+    model = registry.ai_model if kind == 'training' else registry.chat_model
+
+    started = time.perf_counter()
+    report = asyncio.run(bulk.import_file(kind, path, fmt))
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    exported = asyncio.run(bulk.export_file(kind, os.path.join(workdir, f"export.{fmt}"), fmt))
+    export_seconds = time.perf_counter() - started
+
+    # Корпус заново с диска - как после перезапуска бота
+    model.corpus.flush()
+    if kind == 'training':
+        reloaded = len(TrainingCorpus(config.TRAINING_DATA_PATH, config.TRAINING_JOURNAL_PATH).load_data()['texts'])
+    else:
+        reloaded = len(ChatCorpus(config.CHAT_DATA_PATH, config.CHAT_JOURNAL_PATH).load_examples())
+
+    return {
+        "backend": backend,
+        "kind": kind,
+        "format": fmt,
+        "rows": args.rows,
+        "file_mb": round(size / 2 ** 20, 2),
+        "unique": unique,
+        **report,
+        "reloaded": reloaded,
+        "import_seconds": round(import_seconds, 3),
+        "rows_per_second": round(args.rows / import_seconds) if import_seconds else 0,
+        "export_seconds": round(export_seconds, 3),
+        "exported": exported,
+    }
+
+def run_child(backend: str, kind: str, fmt: str, args) -> dict:
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", f"{backend}:{kind}:{fmt}",
+        "--rows", str(args.rows), "--duplicates", str(args.duplicates), "--seed", str(args.seed),
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = (completed.stderr.strip().splitlines() or [f"код {completed.returncode}"])[-1]
+        return {"backend": backend, "kind": kind, "format": fmt, "error": error}
+    return json.loads(lines[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Доля строк-повторов в файле")
+    parser.add_argument("--backends", default="json,sqlite")
+    parser.add_argument("--kinds", default="training,chat")
+    parser.add_argument("--formats", default="csv,jsonl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Файл для результатов в JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        backend, kind, fmt = args.child.split(":")
+        with tempfile.TemporaryDirectory(prefix="import-bench-") as workdir:
+            result = measure(backend, kind, fmt, args, workdir)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    results = []
+    print(f"{'хранилище':<10}{'корпус':<10}{'формат':<8}{'МБ':>7}{'добавлено':>11}{'повторов':>10}"
+          f"{'пропущено':>11}{'с диска':>9}{'импорт, с':>11}{'строк/с':>9}{'выгрузка, с':>13}")
+    for backend in args.backends.split(","):
+        for kind in args.kinds.split(","):
+            for fmt in args.formats.split(","):
+                result = run_child(backend, kind, fmt, args)
+                results.append(result)
+                if "error" in result:
+                    print(f"{backend:<10}{kind:<10}{fmt:<8} ошибка: {result['error']}")
+                    continue
+                print(f"{backend:<10}{kind:<10}{fmt:<8}{result['file_mb']:>7.1f}{result['added']:>11}"
+                      f"{result['duplicates']:>10}{result['invalid']:>11}{result['reloaded']:>9}"
+                      f"{result['import_seconds']:>11.2f}{result['rows_per_second']:>9}{result['export_seconds']:>13.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
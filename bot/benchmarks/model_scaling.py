@@ -0,0 +1,248 @@
+"""Масштабирование моделей по размеру корпуса.
+
+Для каждого размера корпуса и движка (``AIModel``: batch, incremental;
+``ChatModel``: sparse, lsa) в отдельном процессе генерируется синтетический
+корпус, модель обучается, сохраняется и загружается заново, как при старте
+бота, после чего замеряются:
+
+- время обучения (``train``) и загрузки артефакта;
+- задержка одиночного запроса (``predict`` / ``get_response``), p50 и p99;
+- задержка пачки (``predict_batch`` / ``get_responses``) и время на запрос в ней;
+- пиковый RSS процесса и размер артефакта на диске.
+
+Частоты слов и меток подчиняются закону Ципфа: число меток растет с
+корпусом (``--label-ratio``), несколько меток встречаются часто, а у
+большинства всего несколько примеров. Запросы - перефразированные примеры
+корпуса, чтобы не срабатывало точное совпадение.
+
+Итог - таблица (``--markdown``) и JSON (``--json``). Столбец "рост" -
+показатель степени времени обучения между соседними размерами: заметно
+больше 1 значит сверхлинейный рост.
+
+    python benchmarks/model_scaling.py --sizes 1000,10000,100000 --markdown scaling.md
+    python benchmarks/model_scaling.py --sizes 1000000 --models chat --timeout 7200
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import config  # noqa: E402
+from benchmarks.common import percentile, redirect_paths  # noqa: E402
+
+ENGINES = {'ai': ('batch', 'incremental'), 'chat': ('sparse', 'lsa')}
+
+def make_corpus(size: int, label_ratio: float, vocabulary: int, seed: int):
+    """Синтетический корпус: тексты из слов темы метки и общих слов, частоты по Ципфу"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    n_labels = max(2, int(size * label_ratio))
+    labels = np.minimum(rng.zipf(1.3, size) - 1, n_labels - 1)
+    # У каждой метки три слова темы; остальные слова текста - общие частые слова
+    topics = rng.integers(0, vocabulary, size=(n_labels, 3))
+    lengths = rng.integers(4, 13, size)
+    common = np.minimum(rng.zipf(1.2, int(lengths.sum())) - 1, vocabulary - 1)
+    texts, offset = [], 0
+    for i, length in enumerate(lengths):
+        words = [f"t{word}" for word in topics[labels[i]][:rng.integers(1, 4)]]
+        words += [f"w{word}" for word in common[offset:offset + length - len(words)]]
+        offset += length
+        rng.shuffle(words)
+        texts.append(" ".join(words) + f" n{i}")
+    return texts, [f"метка {label}" for label in labels]
+
+def paraphrase(texts: list, count: int, seed: int) -> list:
+    """Запросы для замеров: примеры корпуса с лишним словом (мимо точного совпадения)"""
+    import random
+    rng = random.Random(seed)
+    return [f"{rng.choice(texts)} новое{rng.randint(0, 999)}" for _ in range(count)]
+
+def artifact_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+def current_rss() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def measure(model: str, engine: str, size: int, args, workdir: str) -> dict:
+    """Один замер (выполняется в отдельном процессе ради честного пикового RSS)"""
+    redirect_paths(workdir)
+    config.LOG_FILE = ""
+    config.RESPONSE_CACHE_SIZE = 0
+    if model == 'ai':
+        config.AI_MODEL_MODE = engine
+    else:
+        config.CHAT_ENGINE = engine
+
+    texts, labels = make_corpus(size, args.label_ratio, args.vocabulary, args.seed)
+    if model == 'ai':
+        with open(config.TRAINING_DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump({"texts": texts, "labels": labels}, f, ensure_ascii=False)
+    else:
+        with open(config.CHAT_DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump(dict(zip(texts, labels)), f, ensure_ascii=False)
+    queries = paraphrase(texts, args.queries, args.seed + 1)
+    n_labels = len(set(labels))
+    del texts, labels
+    baseline_rss = current_rss()
+
+    if model == 'ai':
+        from models.ai_model import AIModel
+        started = time.perf_counter()
+        if not AIModel().train():
+            raise RuntimeError("Обучение не удалось")
+        fit_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = AIModel()
+        loaded.load_model()
+        load_seconds = time.perf_counter() - started
+        single, batch = loaded.predict, loaded.predict_batch
+        path = loaded.model_file if engine == 'incremental' else loaded.artifact_path
+    else:
+        from models.chat_model import ChatModel
+        started = time.perf_counter()
+        if not ChatModel().train():
+            raise RuntimeError("Обучение не удалось")
+        fit_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = ChatModel()
+        load_seconds = time.perf_counter() - started
+        single, batch = loaded.get_response, loaded.get_responses
+        path = str(loaded.model_path)
+
+    single(queries[0])  # Прогрев
+    single_times = []
+    for query in queries:
+        started = time.perf_counter()
+        single(query)
+        single_times.append(time.perf_counter() - started)
+    batch_times = []
+    for start in range(0, len(queries) - args.batch + 1, args.batch):
+        started = time.perf_counter()
+        batch(queries[start:start + args.batch])
+        batch_times.append(time.perf_counter() - started)
+
+    return {
+        "model": model,
+        "engine": engine,
+        "size": size,
+        "labels": n_labels,
+        "fit_seconds": round(fit_seconds, 3),
+        "load_seconds": round(load_seconds, 4),
+        "single_p50_ms": round(percentile(single_times, 50) * 1000, 3),
+        "single_p99_ms": round(percentile(single_times, 99) * 1000, 3),
+        "batch_p50_ms": round(percentile(batch_times, 50) * 1000, 3),
+        "batch_per_query_ms": round(percentile(batch_times, 50) * 1000 / args.batch, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "corpus_rss_mb": round(baseline_rss / 2 ** 20, 1),
+        "artifact_mb": round(artifact_size(path) / 2 ** 20, 2),
+    }
+
+def run_child(model: str, engine: str, size: int, args) -> dict:
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", f"{model}:{engine}:{size}",
+        "--label-ratio", str(args.label_ratio), "--vocabulary", str(args.vocabulary),
+        "--queries", str(args.queries), "--batch", str(args.batch), "--seed", str(args.seed),
+    ]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout)
+    except subprocess.TimeoutExpired:
+        return {"model": model, "engine": engine, "size": size, "error": f"timeout {args.timeout:g} с"}
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = (completed.stderr.strip().splitlines() or [f"код {completed.returncode}"])[-1]
+        return {"model": model, "engine": engine, "size": size, "error": error}
+    return json.loads(lines[-1])
+
+def add_growth(results: list):
+    """Показатель роста времени обучения относительно предыдущего размера того же движка"""
+    previous = {}
+    for result in results:
+        key = (result["model"], result["engine"])
+        before = previous.get(key)
+        if before and "error" not in result and "error" not in before and before["fit_seconds"] > 0:
+            result["fit_growth"] = round(
+                math.log(max(result["fit_seconds"], 1e-6) / before["fit_seconds"]) / math.log(result["size"] / before["size"]), 2
+            )
+        previous[key] = result
+
+COLUMNS = [
+    ("model", "модель"), ("engine", "движок"), ("size", "примеров"), ("labels", "меток"), ("fit_seconds", "обучение, с"),
+    ("fit_growth", "рост"), ("load_seconds", "загрузка, с"), ("single_p50_ms", "запрос p50, мс"),
+    ("single_p99_ms", "запрос p99, мс"), ("batch_p50_ms", "пачка, мс"), ("batch_per_query_ms", "на запрос в пачке, мс"),
+    ("peak_rss_mb", "пик RSS, МБ"), ("artifact_mb", "артефакт, МБ"),
+]
+
+def markdown_table(results: list) -> str:
+    lines = ["| " + " | ".join(title for _, title in COLUMNS) + " |", "|" + "---|" * len(COLUMNS)]
+    for result in results:
+        if "error" in result:
+            cells = [str(result["model"]), result["engine"], str(result["size"]), f"ошибка: {result['error']}"]
+            cells += [""] * (len(COLUMNS) - len(cells))
+        else:
+            cells = [str(result.get(key, "")) for key, _ in COLUMNS]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Размеры корпуса через запятую (до 1000000)")
+    parser.add_argument("--models", default="ai,chat", help="ai, chat или оба через запятую")
+    parser.add_argument("--engines", help="Ограничить движки, например batch,sparse")
+    parser.add_argument("--label-ratio", type=float, default=0.02, help="Число меток на пример корпуса")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=config.BATCH_MAX_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=3600, help="Предел на один замер, секунды")
+    parser.add_argument("--json", help="Файл для результатов в JSON")
+    parser.add_argument("--markdown", help="Файл для таблицы сравнения")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        model, engine, size = args.child.split(":")
+        with tempfile.TemporaryDirectory(prefix="model-scaling-") as workdir:
+            result = measure(model, engine, int(size), args, workdir)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    engines = set(args.engines.split(",")) if args.engines else None
+    results = []
+    for model in args.models.split(","):
+        for engine in ENGINES[model]:
+            if engines and engine not in engines:
+                continue
+            for size in sizes:
+                result = run_child(model, engine, size, args)
+                results.append(result)
+                print(json.dumps(result, ensure_ascii=False), file=sys.stderr)
+    add_growth(results)
+
+    table = markdown_table(results)
+    print(table)
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(table + "\n")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""Заглушка сервера Redis-протокола для локальной проверки FSM-хранилища.
+
+Поддерживает команды, которые использует ``core.storage.RespStorage``
+(GET, SET с EX/PX, DEL, MGET, EXPIRE, TTL), а также PING, SELECT, AUTH и
+FLUSHDB. Данные живут в памяти процесса.
+
+    python benchmarks/resp_standin.py --port 6380
+    FSM_STORAGE=redis FSM_REDIS_URL=redis://127.0.0.1:6380/0 python bot.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.resp import read_reply  # noqa: E402
+
+def encode_reply(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode_reply(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+class RespStandin:
+    def __init__(self):
+        self.data = {}  # Ключ -> (значение, момент устаревания или None)
+        self.commands = 0
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, name: str, args: list):
+        self.commands += 1
+        if name == "PING":
+            return "PONG"
+        if name in ("SELECT", "AUTH"):
+            return "OK"
+        if name == "FLUSHDB":
+            self.data.clear()
+            return "OK"
+        if name == "GET":
+            return self._get(args[0])
+        if name == "MGET":
+            return [self._get(key) for key in args]
+        if name == "SET":
+            expires = None
+            options = [arg.upper() for arg in args[2:]]
+            if "EX" in options:
+                expires = time.monotonic() + int(args[2 + options.index("EX") + 1])
+            elif "PX" in options:
+                expires = time.monotonic() + int(args[2 + options.index("PX") + 1]) / 1000
+            self.data[args[0]] = (args[1].encode(), expires)
+            return "OK"
+        if name == "DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == "EXPIRE":
+            value = self._get(args[0])
+            if value is None:
+                return 0
+            self.data[args[0]] = (value, time.monotonic() + int(args[1]))
+            return 1
+        if name == "TTL":
+            if self._get(args[0]) is None:
+                return -2
+            expires = self.data[args[0]][1]
+            return -1 if expires is None else max(0, round(expires - time.monotonic()))
+        return ValueError(f"unknown command '{name}'")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                command = await read_reply(reader)
+                name = command[0].decode().upper()
+                args = [arg.decode() for arg in command[1:]]
+                writer.write(encode_reply(self.execute(name, args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+    server = await asyncio.start_server(RespStandin().handle, args.host, args.port)
+    print(f"Заглушка Redis слушает {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""Заглушка Telegram для локальной нагрузки на вебхук.
+
+Поднимает поддельный сервер Bot API (отвечает успехом на любой метод) и
+отправляет в вебхук бота поток синтетических обновлений, после чего
+печатает пропускную способность.
+
+Запуск бота против заглушки:
+    BOT_MODE=webhook BOT_TOKEN=123:TEST TELEGRAM_API_URL=http://127.0.0.1:8081 python bot.py
+Запуск заглушки:
+    python benchmarks/webhook_standin.py --updates 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from aiohttp import ClientSession, web
+
+def fake_message(chat_id: int, text: str = "ok") -> dict:
+    return {
+        "message_id": 1,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "text": text,
+    }
+
+class FakeBotAPI:
+    """Отвечает на вызовы Bot API, считая их по методам"""
+
+    def __init__(self):
+        self.calls = {}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method.startswith("send") or method.startswith("edit"):
+            data = await request.post()
+            result = fake_message(int(data.get("chat_id", 0) or 0))
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+def make_update(update_id: int, user_id: int, text: str) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": "Load"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": text,
+        },
+    }
+
+async def send_updates(url: str, secret: str, total: int, concurrency: int, users: int, texts: list):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    counter = itertools.count(1)
+    statuses = {}
+
+    async def worker(session: ClientSession):
+        while True:
+            update_id = next(counter)
+            if update_id > total:
+                return
+            update = make_update(update_id, 1000 + update_id % users, texts[update_id % len(texts)])
+            async with session.post(url, json=update, headers=headers) as response:
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    async with ClientSession() as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        return time.perf_counter() - start, statuses
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--webhook", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("--secret", default="")
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--drain", type=float, default=1.0, help="Сколько секунд ждать вызовов API после отправки")
+    parser.add_argument("--text", action="append", help="Текст сообщений (можно несколько раз)")
+    args = parser.parse_args()
+
+    api = FakeBotAPI()
+    runner = web.AppRunner(api.create_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.api_port).start()
+    try:
+        elapsed, statuses = await send_updates(
+            args.webhook, args.secret, args.updates, args.concurrency, args.users, args.text or ["Мой ID"]
+        )
+        # Даем боту дообработать обновления, принятые в фоне
+        await asyncio.sleep(args.drain)
+    finally:
+        await runner.cleanup()
+
+    print(f"Отправлено {args.updates} обновлений за {elapsed:.2f} с: {args.updates / elapsed:.0f} обновлений/с")
+    print(f"Ответы вебхука: {statuses}")
+    print(f"Вызовы Bot API: {api.calls}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
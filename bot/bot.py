@@ -1,32 +1,103 @@
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.base import BaseSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command
 from core.config import config
+from core.keyboards import get_button_texts
+from core.logs import setup_logging
+from core.metrics import MetricsServer
+from core.outbox import outbox
+from core.storage import create_storage
 from handlers import common, prediction, chat, admin
+from models.batching import poll_corpora
+from models.registry import registry
+from middlewares.buttons import setup_button_index
+from middlewares.metrics import HandlerMetricsMiddleware
+from middlewares.readiness import ReadinessMiddleware
+from middlewares.tracing import ApiTimingMiddleware, setup_tracing
 import asyncio
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
-async def main():
-    bot = Bot(token=config.BOT_TOKEN)
-    dp = Dispatcher()
+_background_tasks = set()
+_polling_tasks = set()
+
+async def warm_up_models():
+    """Загружает модели в фоне: меню отвечает сразу, остальное - после ``registry.ready``"""
+    task = asyncio.create_task(asyncio.to_thread(registry.warm_up))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def start_corpus_polling():
+    """Запускает фоновое дочитывание корпусов, измененных другими процессами"""
+    _polling_tasks.add(asyncio.create_task(poll_corpora(config.CORPUS_POLL_INTERVAL)))
+
+async def stop_corpus_polling():
+    for task in _polling_tasks:
+        task.cancel()
+    _polling_tasks.clear()
+
+def create_bot(session: BaseSession = None) -> Bot:
+    """Создает бота; с ``TELEGRAM_API_URL`` запросы идут на указанный сервер Bot API"""
+    if session is None and config.TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_URL))
+    bot = Bot(token=config.BOT_TOKEN, session=session)
+    bot.session.middleware(ApiTimingMiddleware())
+    return bot
+
+def build_dispatcher(metrics_port: int = config.METRICS_PORT, warm_up: bool = True,
+                     corpus_polling: bool = True) -> Dispatcher:
+    """Создает диспетчер со всеми роутерами, сервером метрик и фоновой загрузкой моделей.
+
+    Супервизор (supervisor.py) только раздает обновления: ему не нужны ни
+    модели (``warm_up``), ни дочитывание корпусов (``corpus_polling``).
+    """
+    dp = Dispatcher(storage=create_storage())
+    setup_tracing(dp)
     
     # Правильный порядок подключения роутеров (от более специфичных к общим)
-    dp.include_router(admin.admin_router)
-    dp.include_router(chat.chat_router)
-    dp.include_router(prediction.prediction_router)
-    dp.include_router(common.common_router)
+    routers = {
+        'admin': admin.admin_router,
+        'chat': chat.chat_router,
+        'prediction': prediction.prediction_router,
+        'common': common.common_router,
+    }
+    for name, router in routers.items():
+        router.message.middleware(HandlerMetricsMiddleware(name))
+        router.callback_query.middleware(HandlerMetricsMiddleware(name))
+        router.message.middleware(ReadinessMiddleware())
+        router.callback_query.middleware(ReadinessMiddleware())
+        dp.include_router(router)
+    # Кнопки меню находят обработчик по словарю, свободный текст - по цепочке фильтров
+    setup_button_index(dp, get_button_texts())
+    if warm_up:
+        dp.startup.register(warm_up_models)
+    if corpus_polling and config.CORPUS_POLL_INTERVAL > 0:
+        dp.startup.register(start_corpus_polling)
+        dp.shutdown.register(stop_corpus_polling)
+    # Перед остановкой отправляем то, что уже лежит в очереди
+    dp.shutdown.register(outbox.drain)
+    
+    if metrics_port:
+        metrics_server = MetricsServer(config.METRICS_HOST, metrics_port)
+        dp.startup.register(metrics_server.start)
+        dp.shutdown.register(metrics_server.stop)
+    return dp
+
+async def main():
+    config.ensure_directories()
+    bot = create_bot()
+    dp = build_dispatcher()
     
-    await dp.start_polling(bot)
+    if config.BOT_MODE == "webhook":
+        from core.webhook import run_webhook
+        await run_webhook(bot, dp)
+    else:
+        await dp.start_polling(bot)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -9,15 +9,113 @@ class Config:
     BOT_TOKEN = os.getenv("BOT_TOKEN")
     ADMIN_IDS = [int(id_) for id_ in os.getenv("ADMIN_IDS", "").split(",") if id_]
     
+    # Прием обновлений: "polling" или "webhook"
+    BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Публичный адрес; если не задан, вебхук не регистрируется
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+    WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "100"))
+    WEBHOOK_REUSE_PORT = os.getenv("WEBHOOK_REUSE_PORT", "0") == "1"
+    # Число процессов-обработчиков при запуске через supervisor.py
+    BOT_WORKERS = int(os.getenv("BOT_WORKERS", str(os.cpu_count() or 1)))
+    # Свой сервер Bot API (например, локальная заглушка для нагрузочных тестов)
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+    
     # Пути к файлам и директориям
     BASE_DIR = Path(__file__).parent.parent
     MODEL_PATH = str(BASE_DIR / "ai_model" / "saved_model")
     TRAINING_DATA_PATH = str(BASE_DIR / "data" / "training_data.json")
     CHAT_DATA_PATH = str(BASE_DIR / "data" / "chat_data.json")
+    TRAINING_JOURNAL_PATH = str(BASE_DIR / "data" / "training_data.journal.jsonl")
+    CHAT_JOURNAL_PATH = str(BASE_DIR / "data" / "chat_data.journal.jsonl")
+    
+    # Хранилище корпусов: "json" (снапшот + журнал) или "sqlite"
+    CORPUS_BACKEND = os.getenv("CORPUS_BACKEND", "json").lower()
+    CORPUS_DB_PATH = os.getenv("CORPUS_DB_PATH", str(BASE_DIR / "data" / "corpus.sqlite3"))
+    ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "10"))
+    
+    # Массовый импорт и выгрузка CSV/JSONL: строк в порции разбора (и странице выгрузки), интервал сообщений о прогрессе (с), предел файла (МБ)
+    IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+    IMPORT_PROGRESS_INTERVAL = float(os.getenv("IMPORT_PROGRESS_INTERVAL", "5"))
+    IMPORT_MAX_MB = float(os.getenv("IMPORT_MAX_MB", "20"))
+    
+    # Хранилище состояний FSM: memory, redis или sqlite; TTL в секундах (0 - бессрочно)
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "memory").lower()
+    FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://127.0.0.1:6379/0")
+    FSM_DB_PATH = os.getenv("FSM_DB_PATH", str(BASE_DIR / "data" / "fsm.sqlite3"))
+    FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", "0"))
+    FSM_DATA_TTL = int(os.getenv("FSM_DATA_TTL", "0"))
+    
+    # Журнал добавлений: групповая запись и компактизация в снапшот
+    JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "0.2"))
+    JOURNAL_COMPACT_THRESHOLD = int(os.getenv("JOURNAL_COMPACT_THRESHOLD", "1000"))
+    
+    # Обучение моделей в отдельных процессах
+    TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "1"))
+    TRAINING_PROGRESS_INTERVAL = float(os.getenv("TRAINING_PROGRESS_INTERVAL", "30"))
+    
+    # Режим модели вопрос-ответ: "batch" (полное переобучение) или "incremental"
+    AI_MODEL_MODE = os.getenv("AI_MODEL_MODE", "batch").lower()
+    INCREMENTAL_N_FEATURES = int(os.getenv("INCREMENTAL_N_FEATURES", str(2 ** 18)))
+    
+    # Классификатор режима batch: forest, linear_svm, logreg, complement_nb, nearest_centroid или auto
+    AI_MODEL_BACKEND = os.getenv("AI_MODEL_BACKEND", "forest").lower()
+    AI_FOREST_TREES = int(os.getenv("AI_FOREST_TREES", "100"))
+    AI_FOREST_MAX_DEPTH = int(os.getenv("AI_FOREST_MAX_DEPTH", "0"))  # 0 - без ограничения
+    # Автовыбор: кросс-валидация кандидатов, самый точный в пределах бюджетов p99 (мс) и памяти (МБ)
+    AI_AUTO_CANDIDATES = os.getenv("AI_AUTO_CANDIDATES", "forest,linear_svm,logreg,complement_nb,nearest_centroid")
+    AI_AUTO_FOLDS = int(os.getenv("AI_AUTO_FOLDS", "3"))
+    AI_AUTO_P99_MS = float(os.getenv("AI_AUTO_P99_MS", "10"))
+    AI_AUTO_MEMORY_MB = float(os.getenv("AI_AUTO_MEMORY_MB", "256"))
+    
+    # Порог косинусной близости для ответа чата (0.68 соответствует прежней евклидовой дистанции 0.8)
+    CHAT_MIN_SIMILARITY = float(os.getenv("CHAT_MIN_SIMILARITY", "0.68"))
+    
+    # Движок поиска чата: sparse (инвертированный индекс TF-IDF) или lsa (плотные эмбеддинги SVD)
+    CHAT_ENGINE = os.getenv("CHAT_ENGINE", "sparse")
+    CHAT_LSA_DIM = int(os.getenv("CHAT_LSA_DIM", "256"))
+    CHAT_LSA_DTYPE = os.getenv("CHAT_LSA_DTYPE", "float32")  # float32 или float16
+    CHAT_LSA_MIN_SIMILARITY = float(os.getenv("CHAT_LSA_MIN_SIMILARITY", "0.8"))
+    
+    # Пакетная обработка запросов к моделям
+    BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+    
+    # Логирование: очередь + отдельный поток записи, ротация по размеру
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # Уровни отдельных логгеров: "aiogram.event=WARNING,models=DEBUG"
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text или json
+    LOG_FILE = os.getenv("LOG_FILE", "bot.log")  # Пустая строка - только консоль
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    
+    # Метрики Prometheus на отдельном порту (0 - выключены); процессы supervisor.py занимают порты подряд
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    
+    # Обновления дольше порога (мс) пишутся в лог bot.slow с разбивкой по фазам (0 - выключено)
+    SLOW_UPDATE_MS = float(os.getenv("SLOW_UPDATE_MS", "500"))
+    
+    # Исходящие сообщения: общий лимит бота и лимит чата (в секунду), параллельные запросы, повторы
+    OUTBOX_GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "30"))
+    OUTBOX_CHAT_RATE = float(os.getenv("OUTBOX_CHAT_RATE", "1"))
+    OUTBOX_CHAT_BURST = float(os.getenv("OUTBOX_CHAT_BURST", "3"))
+    OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "8"))
+    OUTBOX_MAX_RETRIES = int(os.getenv("OUTBOX_MAX_RETRIES", "5"))
+    
+    # Кэш ответов моделей (0 - выключен), срок жизни записи в секундах
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    # Как часто дочитывать правки корпусов из других процессов (сбрасывают кэш ответов), секунды; 0 - не дочитывать
+    CORPUS_POLL_INTERVAL = float(os.getenv("CORPUS_POLL_INTERVAL", "1"))
     
-    # Создаем директории, если они не существуют
-    os.makedirs(MODEL_PATH, exist_ok=True)
-    os.makedirs(os.path.dirname(TRAINING_DATA_PATH), exist_ok=True)
-    os.makedirs(os.path.dirname(CHAT_DATA_PATH), exist_ok=True)
+    def ensure_directories(self):
+        """Создает директории моделей и данных, если они не существуют (вызывается при запуске)"""
+        os.makedirs(self.MODEL_PATH, exist_ok=True)
+        os.makedirs(os.path.dirname(self.TRAINING_DATA_PATH), exist_ok=True)
+        os.makedirs(os.path.dirname(self.CHAT_DATA_PATH), exist_ok=True)
 
 config = Config()
\ No newline at end of file
@@ -1,4 +1,10 @@
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
+
+class CorpusPage(CallbackData, prefix="corpus"):
+    """Переход по страницам результатов поиска в корпусе"""
+    direction: str  # "next" - после cursor, "prev" - до cursor
+    cursor: int
 
 def get_start_keyboard():
     return ReplyKeyboardMarkup(
@@ -33,4 +39,25 @@ def get_chat_admin_keyboard():
             [KeyboardButton(text="Обучать"), KeyboardButton(text="Выход")]
         ],
         resize_keyboard=True
-    )
\ No newline at end of file
+    )
+
+def get_button_texts() -> set:
+    """Тексты всех кнопок reply-клавиатур (ключи индекса кнопок)"""
+    keyboards = [get_start_keyboard(), get_main_keyboard(True), get_exit_keyboard(), get_chat_admin_keyboard()]
+    return {button.text for keyboard in keyboards for row in keyboard.keyboard for button in row}
+
+def get_pagination_keyboard(first_id: int, last_id: int, has_prev: bool, has_next: bool):
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton(
+            text="◀️ Назад",
+            callback_data=CorpusPage(direction="prev", cursor=first_id).pack()
+        ))
+    if has_next:
+        buttons.append(InlineKeyboardButton(
+            text="Вперед ▶️",
+            callback_data=CorpusPage(direction="next", cursor=last_id).pack()
+        ))
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
\ No newline at end of file
@@ -0,0 +1,110 @@
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from .config import config
+from .tracing import TraceIdFilter
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Стандартные атрибуты LogRecord - все остальное пришло через extra и попадает в JSON
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON; поля из ``extra`` добавляются как есть"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Кладет записи в ограниченную очередь; при переполнении запись отбрасывается, а не ждет диск"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def parse_levels(spec: str) -> dict:
+    """Разбирает ``"aiogram.event=WARNING,models=DEBUG"`` в словарь уровней"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+_configured = False
+_handlers = []  # Консоль и файл процесса, который пишет логи
+
+def setup_logging(log_queue=None):
+    """Настраивает логирование через очередь: запись на диск идет в отдельном потоке.
+
+    Обработчики бота только кладут запись в очередь; файл с ротацией по
+    размеру и консоль обслуживает поток ``QueueListener``. Процессы-обработчики
+    supervisor.py передают ``log_queue`` - межпроцессную очередь супервизора
+    (см. ``worker_log_queue``): их записи пишет в файл только супервизор, и
+    ротацию одного файла не делят несколько процессов.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    root = logging.getLogger()
+    root.setLevel(config.LOG_LEVEL)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for name, level in parse_levels(config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    if log_queue is None:
+        if config.LOG_FORMAT == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(TEXT_FORMAT)
+        _handlers.append(logging.StreamHandler())
+        if config.LOG_FILE:
+            _handlers.append(logging.handlers.RotatingFileHandler(
+                config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES,
+                backupCount=config.LOG_BACKUP_COUNT, encoding="utf-8"
+            ))
+        for handler in _handlers:
+            handler.setFormatter(formatter)
+        log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+        listener = logging.handlers.QueueListener(log_queue, *_handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    # Фильтр выполняется в потоке, который пишет запись, - там доступна трассировка обновления
+    queue_handler.addFilter(TraceIdFilter())
+    root.addHandler(queue_handler)
+
+def worker_log_queue(context):
+    """Межпроцессная очередь логов для процессов-обработчиков; записи из нее пишут обработчики этого процесса"""
+    setup_logging()
+    log_queue = context.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    listener = logging.handlers.QueueListener(log_queue, *_handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return log_queue
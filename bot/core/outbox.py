@@ -0,0 +1,292 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from aiogram.exceptions import TelegramEntityTooLarge, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from .config import config
+from .metrics import metrics, LATENCY_BUCKETS
+from .tracing import current_trace
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты исходящих сообщений: меньше - раньше
+INTERACTIVE = 0  # Ответы на действия пользователя
+BULK = 1  # Уведомления о прогрессе, рассылки
+
+outbox_latency = metrics.histogram(
+    "bot_outbox_latency_seconds", "Время от постановки сообщения в очередь до ответа API",
+    ("priority",), LATENCY_BUCKETS + (30.0, 60.0)
+)
+outbox_retries = metrics.counter("bot_outbox_retries_total", "Повторные отправки", ("reason",))
+outbox_failures = metrics.counter("bot_outbox_failures_total", "Сообщения, которые не удалось отправить", ("reason",))
+outbox_depth = metrics.gauge("bot_outbox_queue_depth", "Сообщений в очереди на отправку")
+
+class TokenBucket:
+    """Ведро токенов: ``rate`` в секунду, не больше ``capacity`` подряд"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен (0 - уже доступен)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+class _Item:
+    __slots__ = ("method", "priority", "future", "enqueued", "waiting_since", "attempts", "context")
+
+    def __init__(self, method, priority: int, future: asyncio.Future):
+        self.method = method
+        self.priority = priority
+        self.future = future
+        self.enqueued = self.waiting_since = time.monotonic()
+        self.attempts = 0
+        # Контекст отправителя: отправка идет под трассировкой его обновления
+        self.context = contextvars.copy_context()
+
+class Outbox:
+    """Очередь исходящих сообщений с учетом лимитов Telegram.
+
+    Обработчик кладет готовый метод (``message.answer(...)`` без ``await``)
+    в ``send`` и сразу возвращается. Планировщик отправляет сообщения, пока
+    хватает токенов в общем ведре (``global_rate`` в секунду) и в ведре чата
+    (``chat_rate``, всплеск до ``chat_burst``). Сообщения одного чата уходят
+    строго по очереди, среди готовых чатов первыми идут интерактивные ответы.
+    На 429 отправка всего бота приостанавливается на ``retry_after`` со
+    случайной добавкой, сетевые ошибки и 5xx повторяются с экспоненциальной
+    задержкой до ``max_retries`` раз.
+
+    Отправка идет в контексте вызова ``send``: ожидание в очереди и запрос к
+    API попадают в фазы ``outbox`` и ``api`` трассировки обновления, а сама
+    трассировка закрывается, когда отправлены все ответы обработчика.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float,
+                 concurrency: int = 8, max_retries: int = 5):
+        # Общее ведро без всплеска: в любом окне в 1 с не больше ``global_rate`` отправок
+        self.global_bucket = TokenBucket(global_rate, 1)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._chats = {}  # chat_id -> очередь сообщений чата
+        self._buckets = {}  # chat_id -> ведро чата
+        self._busy = set()  # Чаты, чье сообщение сейчас отправляется
+        self._waiting = []  # (момент готовности, seq, chat_id) - чаты, ждущие токена чата
+        self._ready = []  # (приоритет, seq, chat_id) - чаты, готовые к отправке
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._wakeup = None
+        self._task = None
+        self._slots = None
+        self._inflight = set()
+        self._pruned = time.monotonic()
+        self.size = 0
+        self.sent = 0
+        outbox_depth.set_function(lambda: self.size)
+
+    def send(self, method, priority: int = INTERACTIVE) -> asyncio.Future:
+        """Ставит метод Bot API в очередь; результат - future с ответом API"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            # Свой контекст: отправки не должны попадать в трассировку обновления, запустившего планировщик
+            self._task = loop.create_task(self._run(), context=contextvars.Context())
+        future = loop.create_future()
+        # Исключение отправки уже записано в лог - не даем asyncio ругаться на непрочитанный future
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        trace = current_trace.get()
+        if trace is not None:
+            trace.hold()
+            future.add_done_callback(lambda done: trace.release())
+        chat_id = getattr(method, "chat_id", None)
+        queue = self._chats.setdefault(chat_id, deque())
+        queue.append(_Item(method, priority, future))
+        self.size += 1
+        if len(queue) == 1 and chat_id not in self._busy:
+            self._schedule(chat_id)
+        return future
+
+    def set_global_rate(self, rate: float):
+        """Меняет общий лимит (процессы supervisor.py делят лимит бота между собой)"""
+        self.global_bucket = TokenBucket(rate, 1)
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _schedule(self, chat_id, backoff: float = 0.0):
+        """Ставит чат в очередь планировщика по токенам его ведра (и задержке повтора)"""
+        now = time.monotonic()
+        delay = self._bucket(chat_id).delay(now) if chat_id is not None else 0.0
+        delay = max(delay, backoff)
+        if delay:
+            heapq.heappush(self._waiting, (now + delay, next(self._seq), chat_id))
+        else:
+            heapq.heappush(self._ready, (self._chats[chat_id][0].priority, next(self._seq), chat_id))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            if now - self._pruned > 60:
+                self._prune(now)
+            while self._waiting and self._waiting[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._waiting)
+                heapq.heappush(self._ready, (self._chats[chat_id][0].priority, next(self._seq), chat_id))
+
+            delay = None
+            if self._ready:
+                delay = max(self._paused_until - now, self.global_bucket.delay(now))
+                if delay <= 0:
+                    await self._slots.acquire()
+                    _, _, chat_id = heapq.heappop(self._ready)
+                    self._dispatch(chat_id, time.monotonic())
+                    continue
+            if self._waiting:
+                until_chat = self._waiting[0][0] - now
+                delay = until_chat if delay is None else min(delay, until_chat)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prune(self, now: float):
+        """Забывает ведра простаивающих чатов: полное ведро ничем не отличается от нового"""
+        self._pruned = now
+        for chat_id in [chat_id for chat_id, bucket in self._buckets.items()
+                        if chat_id not in self._chats and bucket.delay(now) == 0 and bucket.tokens >= bucket.capacity]:
+            del self._buckets[chat_id]
+
+    def _dispatch(self, chat_id, now: float):
+        self.global_bucket.take(now)
+        if chat_id is not None:
+            self._bucket(chat_id).take(now)
+        self._busy.add(chat_id)
+        item = self._chats[chat_id][0]
+        task = asyncio.create_task(self._send(chat_id, item), context=item.context)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, chat_id, item: _Item):
+        done = True
+        backoff = 0.0
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add("outbox", time.monotonic() - item.waiting_since)
+        try:
+            result = await item.method
+        except TelegramRetryAfter as e:
+            # Лимит бота целиком: останавливаем все отправки, это сообщение повторим первым
+            self._paused_until = time.monotonic() + e.retry_after + random.uniform(0, 1)
+            done = self._retry(item, "retry_after", e)
+            logger.warning(f"Лимит Telegram, пауза {e.retry_after} с")
+        except (TelegramNetworkError, TelegramServerError) as e:
+            if isinstance(e, TelegramEntityTooLarge):
+                self._fail(chat_id, item, e)
+            else:
+                # Повтор только этого чата: экспоненциальная задержка со случайной добавкой
+                done = self._retry(item, "network", e)
+                backoff = min(30.0, 0.5 * 2 ** item.attempts) * random.uniform(0.5, 1.5)
+        except Exception as e:
+            self._fail(chat_id, item, e)
+        else:
+            self.sent += 1
+            outbox_latency.observe(time.monotonic() - item.enqueued, priority="interactive" if item.priority == INTERACTIVE else "bulk")
+            item.future.set_result(result)
+        finally:
+            self._slots.release()
+            self._busy.discard(chat_id)
+            queue = self._chats[chat_id]
+            if done:
+                queue.popleft()
+                self.size -= 1
+            else:
+                item.waiting_since = time.monotonic()
+            if queue:
+                self._schedule(chat_id, 0.0 if done else backoff)
+            else:
+                del self._chats[chat_id]
+                self._wakeup.set()
+
+    def _fail(self, chat_id, item: _Item, error: Exception):
+        outbox_failures.inc(reason=type(error).__name__)
+        logger.error(f"Ошибка отправки сообщения в чат {chat_id}: {error}")
+        item.future.set_exception(error)
+
+    def _retry(self, item: _Item, reason: str, error: Exception) -> bool:
+        """Учитывает попытку; True - попытки кончились и сообщение снято с очереди"""
+        item.attempts += 1
+        if item.attempts > self.max_retries:
+            outbox_failures.inc(reason=reason)
+            logger.error(f"Сообщение не отправлено после {self.max_retries} повторов: {error}")
+            item.future.set_exception(error)
+            return True
+        outbox_retries.inc(reason=reason)
+        return False
+
+    async def drain(self, timeout: float = 10):
+        """Ждет отправки очереди (при остановке бота).
+
+        Если за ``timeout`` секунд очередь не опустела, отправки в полете
+        отменяются, а future оставшихся сообщений отменяются: после закрытия
+        сессии бота отправлять их уже нечем.
+        """
+        deadline = time.monotonic() + timeout
+        while (self.size or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if not self.size and not self._inflight:
+            return
+
+        items = [item for queue in self._chats.values() for item in queue]
+        logger.warning(f"Очередь отправки не опустела за {timeout} с, отменено сообщений: {len(items)}")
+        inflight = list(self._inflight)
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        for item in items:
+            if not item.future.done():
+                item.future.cancel()
+        self._chats.clear()
+        self._busy.clear()
+        self._ready.clear()
+        self._waiting.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        """Метрики очереди для статуса"""
+        return {
+            'queued': self.size,
+            'chats': len(self._chats),
+            'inflight': len(self._inflight),
+            'sent': self.sent,
+            'paused_for': max(0.0, self._paused_until - time.monotonic()),
+        }
+
+outbox = Outbox(
+    config.OUTBOX_GLOBAL_RATE, config.OUTBOX_CHAT_RATE, config.OUTBOX_CHAT_BURST,
+    concurrency=config.OUTBOX_CONCURRENCY, max_retries=config.OUTBOX_MAX_RETRIES
+)
\ No newline at end of file
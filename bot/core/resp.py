@@ -0,0 +1,143 @@
+import asyncio
+from collections import deque
+from urllib.parse import urlparse
+
+class RespError(Exception):
+    """Ошибка, которую вернул сервер Redis"""
+
+def encode_command(args) -> bytes:
+    """Кодирует команду в формат RESP (массив bulk-строк)"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        else:
+            data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+async def read_reply(reader: asyncio.StreamReader):
+    """Читает один ответ RESP2"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Соединение с Redis закрыто")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RespError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Неизвестный ответ Redis: {line!r}")
+
+class RespClient:
+    """Минимальный асинхронный клиент Redis-протокола с конвейером.
+
+    Все команды идут по одному соединению: запросы пишутся сразу, не
+    дожидаясь ответов на предыдущие, а ответы сопоставляются с ожидающими
+    по порядку. Одновременные вызовы из разных обработчиков тем самым
+    конвейеризуются автоматически, а ``pipeline`` отправляет пачку команд
+    одной записью в сокет.
+    """
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._waiters = deque()
+        self._ready = False  # Соединение установлено и AUTH/SELECT выполнены
+        self._connect_lock = asyncio.Lock()
+
+    async def _ensure_connected(self):
+        if self._ready:
+            return
+        async with self._connect_lock:
+            if self._ready:
+                return
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self._reader, self._writer = reader, writer
+            self._read_task = asyncio.create_task(self._read_loop(reader))
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            if setup:
+                for reply in await self._send(setup):
+                    if isinstance(reply, RespError):
+                        self._fail(ConnectionError(f"Ошибка подключения к Redis: {reply}"))
+                        raise reply
+            self._ready = True
+
+    async def _read_loop(self, reader):
+        try:
+            while True:
+                reply = await read_reply(reader)
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(reply)
+        except (ConnectionError, asyncio.IncompleteReadError, IndexError) as e:
+            self._fail(ConnectionError(f"Соединение с Redis потеряно: {e}"))
+        except asyncio.CancelledError:
+            self._fail(ConnectionError("Соединение с Redis закрыто"))
+
+    def _fail(self, error: Exception):
+        """Отклоняет все ожидающие ответы и сбрасывает соединение"""
+        self._ready = False
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(error)
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _send(self, commands):
+        loop = asyncio.get_running_loop()
+        waiters = [loop.create_future() for _ in commands]
+        # Ожидающие добавляются в том же шаге цикла, что и запись, - порядок ответов сохраняется
+        self._waiters.extend(waiters)
+        self._writer.write(b"".join(encode_command(command) for command in commands))
+        await self._writer.drain()
+        return await asyncio.gather(*waiters)
+
+    async def pipeline(self, commands) -> list:
+        """Выполняет пачку команд за один проход; ошибки сервера возвращаются как ``RespError``"""
+        await self._ensure_connected()
+        return await self._send(commands)
+
+    async def execute(self, *args):
+        """Выполняет одну команду"""
+        reply = (await self.pipeline([args]))[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
+        self._ready = False
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from .config import config
+from .resp import RespClient
+from .tracing import phase
+
+logger = logging.getLogger(__name__)
+
+def _state_name(state):
+    return state.state if isinstance(state, State) else state
+
+class KeyValueStorage(BaseStorage):
+    """Общая часть FSM-хранилищ поверх "ключ -> строка" со сроком жизни.
+
+    Состояние и данные хранятся под разными ключами (``fsm:<бот>:<чат>:<пользователь>:state``
+    и ``...:data``), каждый со своим TTL; 0 - без срока жизни.
+    """
+
+    def __init__(self, state_ttl: int = 0, data_ttl: int = 0):
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True)
+        self.state_ttl = state_ttl
+        self.data_ttl = data_ttl
+
+    async def _get(self, name: str):
+        raise NotImplementedError
+
+    async def _set(self, name: str, value, ttl: int):
+        """Записывает значение; ``None`` удаляет ключ"""
+        raise NotImplementedError
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        await self._set(self.key_builder.build(key, "state"), _state_name(state), self.state_ttl)
+
+    async def get_state(self, key: StorageKey):
+        return await self._get(self.key_builder.build(key, "state"))
+
+    async def set_data(self, key: StorageKey, data) -> None:
+        value = json.dumps(dict(data), ensure_ascii=False) if data else None
+        await self._set(self.key_builder.build(key, "data"), value, self.data_ttl)
+
+    async def get_data(self, key: StorageKey) -> dict:
+        value = await self._get(self.key_builder.build(key, "data"))
+        return json.loads(value) if value else {}
+
+class RespStorage(KeyValueStorage):
+    """FSM-хранилище в Redis (или любом сервере Redis-протокола).
+
+    Команды конвейеризуются клиентом: обработчики разных чатов не ждут
+    ответа на чужие запросы.
+    """
+
+    def __init__(self, url: str, state_ttl: int = 0, data_ttl: int = 0):
+        super().__init__(state_ttl, data_ttl)
+        self.client = RespClient(url)
+
+    async def _get(self, name: str):
+        value = await self.client.execute("GET", name)
+        return value.decode() if value is not None else None
+
+    async def _set(self, name: str, value, ttl: int):
+        if value is None:
+            await self.client.execute("DEL", name)
+        elif ttl:
+            await self.client.execute("SET", name, value, "EX", ttl)
+        else:
+            await self.client.execute("SET", name, value)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+class SQLiteStorage(KeyValueStorage):
+    """FSM-хранилище в SQLite, общее для процессов одного хоста (WAL).
+
+    Записи копятся в памяти и сбрасываются одной транзакцией раз в
+    ``flush_interval`` секунд; чтение сначала смотрит в несброшенные записи,
+    поэтому процесс всегда видит свои изменения. Просроченные ключи не
+    возвращаются и удаляются при очередном сбросе.
+    """
+
+    def __init__(self, db_path, state_ttl: int = 0, data_ttl: int = 0, flush_interval: float = 0.05):
+        super().__init__(state_ttl, data_ttl)
+        self.db_path = Path(db_path)
+        self.flush_interval = flush_interval
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pending = {}  # Ключ -> (значение или None, момент устаревания или None)
+        self._flushing = {}
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fsm ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_fsm_expires ON fsm(expires_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _read(self, name: str):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM fsm WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (name, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, batch: dict):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("DELETE FROM fsm WHERE key = ?", [
+                    (name,) for name, (value, _) in batch.items() if value is None
+                ])
+                conn.executemany("INSERT OR REPLACE INTO fsm (key, value, expires_at) VALUES (?, ?, ?)", [
+                    (name, value, expires) for name, (value, expires) in batch.items() if value is not None
+                ])
+                conn.execute("DELETE FROM fsm WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    async def _get(self, name: str):
+        for buffer in (self._pending, self._flushing):
+            if name in buffer:
+                value, expires = buffer[name]
+                if expires is not None and expires <= time.time():
+                    return None
+                return value
+        return await asyncio.to_thread(self._read, name)
+
+    async def _set(self, name: str, value, ttl: int):
+        self._pending[name] = (value, time.time() + ttl if ttl else None)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Сбрасывает накопленные записи одной транзакцией"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            self._flushing, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(self._write, self._flushing)
+            except Exception as e:
+                logger.error(f"Ошибка записи FSM в SQLite: {e}")
+                # Возвращаем записи в очередь, не затирая более свежие
+                self._pending = {**self._flushing, **self._pending}
+            finally:
+                self._flushing = {}
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class TracedStorage(BaseStorage):
+    """Обертка хранилища: обращения к FSM учитываются в фазе ``fsm`` трассировки"""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        with phase("fsm"):
+            await self.storage.set_state(key, state)
+
+    async def get_state(self, key: StorageKey):
+        with phase("fsm"):
+            return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data) -> None:
+        with phase("fsm"):
+            await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> dict:
+        with phase("fsm"):
+            return await self.storage.get_data(key)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+def create_storage() -> BaseStorage:
+    """FSM-хранилище согласно ``config.FSM_STORAGE``"""
+    if config.FSM_STORAGE == "redis":
+        storage = RespStorage(config.FSM_REDIS_URL, config.FSM_STATE_TTL, config.FSM_DATA_TTL)
+    elif config.FSM_STORAGE == "sqlite":
+        storage = SQLiteStorage(config.FSM_DB_PATH, config.FSM_STATE_TTL, config.FSM_DATA_TTL)
+    else:
+        storage = MemoryStorage()
+    return TracedStorage(storage)
@@ -0,0 +1,103 @@
+import time
+import uuid
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Фазы обработки обновления в порядке вывода; "outbox" - ожидание ответов в очереди отправки,
+# "other" - время вне остальных фаз
+PHASES = ("fsm", "filters", "handler", "inference", "outbox", "api", "other")
+
+current_trace = ContextVar("current_trace", default=None)
+
+class Trace:
+    """Трассировка одного обновления: id и чистое время по фазам.
+
+    Фазы вкладываются друг в друга (запрос к API внутри обработчика), время
+    вложенной фазы вычитается из внешней. Вложенность считается отдельно для
+    каждой задачи asyncio: ответы обработчика отправляет очередь
+    ``core.outbox`` в своих задачах, и их фазы (ожидание в очереди и запрос к
+    API) могут идти одновременно с обработчиком.
+
+    Каждое сообщение в очереди отправки держит трассировку (``hold``):
+    обновление считается законченным, когда вернулся обработчик и отправлены
+    все его ответы (``on_finish``).
+    """
+
+    def __init__(self, update_id: int = None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.update_id = update_id
+        self.handler = None
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self._children = {}  # Задача -> время вложенных фаз для каждой ее открытой фазы
+        self._pending = 0  # Ответы обновления, еще не ушедшие из очереди отправки
+        self._on_finish = None
+
+    @contextmanager
+    def phase(self, name: str):
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        children = self._children.setdefault(task, [])
+        started = time.perf_counter()
+        children.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] += elapsed - children.pop()
+            if children:
+                children[-1] += elapsed
+            else:
+                del self._children[task]
+
+    def add(self, name: str, seconds: float):
+        """Добавляет к фазе время, замеренное снаружи (ожидание в очереди отправки)"""
+        self.phases[name] += seconds
+
+    def hold(self):
+        """Откладывает завершение трассировки до ``release`` (сообщение в очереди отправки)"""
+        self._pending += 1
+
+    def release(self):
+        self._pending -= 1
+        if not self._pending and self._on_finish is not None:
+            self._complete()
+
+    def on_finish(self, callback):
+        """Вызывает ``callback(total)``, когда отправлены все удержанные сообщения (или сразу)"""
+        self._on_finish = callback
+        if not self._pending:
+            self._complete()
+
+    def _complete(self):
+        callback, self._on_finish = self._on_finish, None
+        callback(self.finish())
+
+    def finish(self) -> float:
+        """Общее время; неучтенный остаток записывается в фазу ``other``"""
+        total = time.perf_counter() - self.started
+        self.phases["other"] = max(0.0, total - sum(value for name, value in self.phases.items() if name != "other"))
+        return total
+
+@contextmanager
+def phase(name: str):
+    """Замеряет фазу текущего обновления; вне обновления ничего не делает"""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.phase(name):
+        yield
+
+class TraceIdFilter(logging.Filter):
+    """Добавляет ``trace_id`` текущего обновления в записи лога"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = current_trace.get()
+        if trace is not None and not hasattr(record, "trace_id"):
+            record.trace_id = trace.trace_id
+        return True
\ No newline at end of file
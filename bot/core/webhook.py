@@ -0,0 +1,124 @@
+import asyncio
+import hmac
+import logging
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class WebhookServer:
+    """Прием обновлений через вебхук на aiohttp.
+
+    Обновление подтверждается сразу после разбора, а обрабатывается в
+    фоне; число одновременно обрабатываемых обновлений ограничено
+    ``max_concurrency`` - при заполнении пула новые запросы ждут, и
+    Telegram (или балансировщик) получает обратное давление. Экземпляры
+    не хранят общего состояния в памяти процесса, кроме FSM, поэтому их
+    можно запускать несколько за балансировщиком.
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, path: str, secret: str = None, max_concurrency: int = 100):
+        self.bot = bot
+        self.dp = dp
+        self.path = path
+        self.secret = secret
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get("/healthz", self.handle_health)
+        setup_application(app, self.dp, bot=self.bot)
+        app.on_shutdown.append(self._on_shutdown)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if self.secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret):
+            self.rejected += 1
+            return web.Response(status=401)
+        try:
+            data = await request.json()
+        except Exception as e:
+            logger.warning(f"Некорректное обновление в вебхуке: {e}")
+            return web.Response(status=400)
+        return await self.accept(data)
+
+    async def accept(self, data: dict) -> web.Response:
+        """Ставит разобранное обновление в обработку"""
+        try:
+            update = Update.model_validate(data, context={"bot": self.bot})
+        except Exception as e:
+            logger.warning(f"Некорректное обновление в вебхуке: {e}")
+            return web.Response(status=400)
+
+        self.received += 1
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update):
+        try:
+            await self.dp.feed_update(self.bot, update)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Ошибка обработки обновления {update.update_id}: {e}")
+        finally:
+            self._semaphore.release()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': 'ok',
+            'in_flight': len(self._tasks),
+            'max_concurrency': self.max_concurrency,
+            'received': self.received,
+            'processed': self.processed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        })
+
+    async def _on_shutdown(self, app: web.Application):
+        """Дожидается обновлений, которые уже взяты в обработку"""
+        if self._tasks:
+            logger.info(f"Ожидание {len(self._tasks)} обновлений перед остановкой")
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Запускает вебхук-сервер и, если задан ``WEBHOOK_URL``, регистрирует его в Telegram"""
+    server = WebhookServer(
+        bot, dp, config.WEBHOOK_PATH,
+        secret=config.WEBHOOK_SECRET,
+        max_concurrency=config.WEBHOOK_MAX_CONCURRENCY
+    )
+    # Журнал доступа aiohttp на каждое обновление только дублирует логи aiogram
+    runner = web.AppRunner(server.create_app(), access_log=None)
+    await runner.setup()
+    # reuse_port позволяет нескольким процессам на одном хосте слушать общий порт
+    site = web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT, reuse_port=config.WEBHOOK_REUSE_PORT)
+    await site.start()
+    logger.info(f"Вебхук слушает {config.WEBHOOK_HOST}:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}")
+
+    if config.WEBHOOK_URL:
+        await bot.set_webhook(
+            url=config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH,
+            secret_token=config.WEBHOOK_SECRET,
+            max_connections=min(config.WEBHOOK_MAX_CONCURRENCY, 100)
+        )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
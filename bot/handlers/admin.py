@@ -1,15 +1,24 @@
-from aiogram import F, Router
-from aiogram.types import Message
+from aiogram import Bot, F, Router
+from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from core.keyboards import get_main_keyboard, get_exit_keyboard
-from models.ai_model import AIModel
+from core.outbox import outbox, BULK
+from core.keyboards import get_main_keyboard, get_exit_keyboard, get_pagination_keyboard, CorpusPage
+from models.registry import registry
+from models.training import trainer
+from models.batching import prediction_batcher, chat_batcher
+from models.corpus import training_corpus, chat_corpus
+from models.bulk import detect_format, export_file, import_file
 from core.config import config
+import asyncio
 import logging
+import os
+import shutil
+import tempfile
 
 logger = logging.getLogger(__name__)
 admin_router = Router()
-ai_model = AIModel()
 
 class AddDataStates(StatesGroup):
     waiting_for_question = State()
@@ -18,68 +27,239 @@ class AddDataStates(StatesGroup):
 @admin_router.message(F.text == "Обучение")
 async def train_model_handler(message: Message):
     """Обработчик обучения модели"""
-    await message.answer("Начинаю обучение...")
-    if ai_model.train():
-        await message.answer("✅ Модель обучена и сохранена!")
+    if trainer.is_running('ai'):
+        outbox.send(message.answer("⏳ Обучение уже идет, дождитесь его завершения."))
+        return
+
+    async def report_progress(elapsed: float):
+        outbox.send(message.answer(f"⏳ Обучение продолжается ({int(elapsed)} с)..."), priority=BULK)
+
+    outbox.send(message.answer("Начинаю обучение..."))
+    if await trainer.train('ai', report_progress):
+        outbox.send(message.answer(
+            f"✅ Модель обучена и сохранена за {trainer.last_duration['ai']:.1f} с!"
+        ))
     else:
-        await message.answer("❌ Ошибка обучения. Проверьте данные.")
+        outbox.send(message.answer("❌ Ошибка обучения. Проверьте данные."))
 
 @admin_router.message(F.text == "Добавить")
 async def add_data(message: Message, state: FSMContext):
-    await message.answer(
+    outbox.send(message.answer(
         "Введите вопрос:",
         reply_markup=get_exit_keyboard()
-    )
+    ))
     await state.set_state(AddDataStates.waiting_for_question)
 
 @admin_router.message(AddDataStates.waiting_for_question)
 async def process_question(message: Message, state: FSMContext):
     if message.text == "Выход":
         await state.clear()
-        await message.answer(
+        outbox.send(message.answer(
             "Главное меню:",
             reply_markup=get_main_keyboard(True)
-        )
+        ))
         return
 
     # Сохраняем оригинальный текст вопроса
     await state.update_data(question=message.text)
-    await message.answer(
+    outbox.send(message.answer(
         "Теперь введите ответ:",
         reply_markup=get_exit_keyboard()
-    )
+    ))
     await state.set_state(AddDataStates.waiting_for_answer)
 
-@admin_router.message(AddDataStates.waiting_for_answer)
+@admin_router.message(AddDataStates.waiting_for_answer, flags={"models": True})
 async def process_answer(message: Message, state: FSMContext):
     if message.text == "Выход":
         await state.clear()
-        await message.answer(
+        outbox.send(message.answer(
             "Главное меню:",
             reply_markup=get_main_keyboard(True)
-        )
+        ))
         return
 
     data = await state.get_data()
-    ai_model.add_training_data(data['question'], message.text)
+    registry.ai_model.add_training_data(data['question'], message.text)
     await state.clear()
-    await message.answer(
+    outbox.send(message.answer(
         "✅ Данные успешно добавлены!",
         reply_markup=get_main_keyboard(True)
-    )
+    ))
 
-@admin_router.message(F.text == "Статус")
+@admin_router.message(F.text == "Статус", flags={"models": True})
 async def model_status_handler(message: Message):
     """Проверка статуса модели"""
+    ai_model = registry.ai_model
     status = ai_model.get_status()
     data = ai_model.load_data()
+    batching = prediction_batcher.stats()
     
     response = (
         f"📊 Статус модели:\n"
+        f"• Режим: {status['mode']}\n"
+        f"• Классификатор: {status['backend'] or '-'}{' (автовыбор)' if status['auto'] else ''}\n"
         f"• Обучена: {'Да' if status['is_trained'] else 'Нет'}\n"
         f"• Классов: {status['num_classes']}\n"
         f"• Примеров: {len(data['texts'])}\n"
         f"• Уникальных меток: {len(set(data['labels']))}\n"
-        f"• Размер словаря: {status['vocab_size']}"
+        f"• Размер словаря: {status['vocab_size']}\n"
+        f"• Хранилище: {config.CORPUS_BACKEND}\n"
+        f"• Поиск чата: {config.CHAT_ENGINE}\n"
+        f"• Пакеты: {batching['batches']}, средний размер {batching['avg_batch_size']:.1f}, "
+        f"максимум {batching['max_seen_batch']} "
+        f"(окно {batching['window_ms']:g} мс, лимит {batching['max_batch']})"
+    )
+    sending = outbox.stats()
+    response += (
+        f"\n• Отправка: в очереди {sending['queued']} ({sending['chats']} чатов), "
+        f"отправлено {sending['sent']}"
+        + (f", пауза {sending['paused_for']:.0f} с" if sending['paused_for'] else "")
     )
-    await message.answer(response)
\ No newline at end of file
+    for title, batcher in (("Кэш ответов", prediction_batcher), ("Кэш чата", chat_batcher)):
+        if batcher.cache is not None:
+            cache = batcher.cache.stats()
+            response += (
+                f"\n• {title}: {cache['size']}/{cache['max_size']}, "
+                f"попаданий {cache['hits']} ({cache['hit_rate']:.0%}), промахов {cache['misses']}, "
+                f"вытеснено {cache['evictions']}, устарело {cache['invalidations']}"
+            )
+    outbox.send(message.answer(response))
+
+# Команды поиска: команда -> (корпус, поле поиска)
+SEARCH_COMMANDS = {
+    "find": ("training", "substring"),
+    "label": ("training", "label"),
+    "chatfind": ("chat", "substring"),
+    "chatlabel": ("chat", "label"),
+}
+CORPORA = {
+    "training": ("📚 Обучающие примеры", training_corpus),
+    "chat": ("💬 Примеры чата", chat_corpus),
+}
+
+def _shorten(text, limit: int = 80) -> str:
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+async def render_corpus_page(query: dict, after_id: int = 0, before_id: int = None):
+    """Формирует текст страницы результатов и клавиатуру навигации"""
+    title, corpus = CORPORA[query['kind']]
+    rows, has_more = await asyncio.to_thread(
+        corpus.search, query.get('substring'), query.get('label'),
+        after_id, before_id, config.ADMIN_PAGE_SIZE
+    )
+    if not rows:
+        return "Ничего не найдено.", None
+
+    filters = []
+    if query.get('substring'):
+        filters.append(f"текст: «{query['substring']}»")
+    if query.get('label'):
+        filters.append(f"ответ: «{query['label']}»")
+    header = f"{title}" + (f" ({', '.join(filters)})" if filters else "") + ":"
+    lines = [f"#{row_id} {_shorten(text)} → {_shorten(label)}" for row_id, text, label in rows]
+
+    if before_id is not None:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after_id > 0, has_more
+    markup = get_pagination_keyboard(rows[0][0], rows[-1][0], has_prev, has_next)
+    return "\n".join([header, *lines]), markup
+
+@admin_router.message(Command(*SEARCH_COMMANDS), F.from_user.id.in_(config.ADMIN_IDS))
+async def search_corpus_handler(message: Message, command: CommandObject, state: FSMContext):
+    """Поиск по корпусам: /find и /chatfind - по подстроке, /label и /chatlabel - по ответу"""
+    kind, field = SEARCH_COMMANDS[command.command]
+    query = {"kind": kind, field: (command.args or "").strip() or None}
+    await state.update_data(corpus_query=query)
+    text, markup = await render_corpus_page(query)
+    outbox.send(message.answer(text, reply_markup=markup))
+
+@admin_router.callback_query(CorpusPage.filter(), F.from_user.id.in_(config.ADMIN_IDS))
+async def corpus_page_handler(callback: CallbackQuery, callback_data: CorpusPage, state: FSMContext):
+    """Листание результатов поиска"""
+    query = (await state.get_data()).get('corpus_query')
+    if not query:
+        await callback.answer("Поиск устарел, повторите команду.")
+        return
+
+    if callback_data.direction == "prev":
+        text, markup = await render_corpus_page(query, before_id=callback_data.cursor)
+    else:
+        text, markup = await render_corpus_page(query, after_id=callback_data.cursor)
+    outbox.send(callback.message.edit_text(text, reply_markup=markup))
+    await callback.answer()
+
+# Команды массовой загрузки и выгрузки: команда -> корпус
+IMPORT_COMMANDS = {"import": "training", "importchat": "chat"}
+EXPORT_COMMANDS = {"export": "training", "exportchat": "chat"}
+IMPORT_USAGE = (
+    "Пришлите файл .csv или .jsonl с подписью /import (обучающие примеры) или /importchat (чат).\n"
+    "CSV: два столбца - вопрос и ответ (заголовок text,label или question,answer необязателен).\n"
+    "JSONL: строки вида {\"text\": ..., \"label\": ...} или {\"question\": ..., \"answer\": ...}."
+)
+
+@admin_router.message(Command(*IMPORT_COMMANDS), F.from_user.id.in_(config.ADMIN_IDS), flags={"models": True})
+async def import_corpus_handler(message: Message, command: CommandObject, bot: Bot):
+    """Массовый импорт примеров из присланного CSV/JSONL"""
+    document = message.document
+    if document is None:
+        outbox.send(message.answer(IMPORT_USAGE))
+        return
+    fmt = detect_format(document.file_name)
+    if fmt is None:
+        outbox.send(message.answer("Поддерживаются только файлы .csv и .jsonl."))
+        return
+    if document.file_size and document.file_size > config.IMPORT_MAX_MB * 2 ** 20:
+        outbox.send(message.answer(f"Файл больше {config.IMPORT_MAX_MB:g} МБ."))
+        return
+
+    kind = IMPORT_COMMANDS[command.command]
+
+    async def report_progress(read: int):
+        outbox.send(message.answer(f"⏳ Импорт: прочитано {read} строк..."), priority=BULK)
+
+    outbox.send(message.answer("Загружаю файл..."))
+    workdir = tempfile.mkdtemp(prefix="import-")
+    try:
+        path = os.path.join(workdir, "data")
+        await bot.download(document, destination=path)
+        report = await import_file(kind, path, fmt, report_progress)
+    except Exception as e:
+        logger.error(f"Ошибка импорта: {e}")
+        outbox.send(message.answer("❌ Ошибка импорта. Проверьте формат и кодировку файла (UTF-8)."))
+        return
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    outbox.send(message.answer(
+        f"✅ Импорт завершен: прочитано {report['read']}, добавлено {report['added']}, "
+        f"повторов {report['duplicates']}, пропущено {report['invalid']}.\n"
+        f"Чтобы модель учла новые примеры, запустите обучение."
+    ))
+
+@admin_router.message(Command(*EXPORT_COMMANDS), F.from_user.id.in_(config.ADMIN_IDS))
+async def export_corpus_handler(message: Message, command: CommandObject):
+    """Выгрузка корпуса файлом: /export [csv|jsonl], /exportchat [csv|jsonl]"""
+    fmt = (command.args or "jsonl").strip().lower()
+    if fmt not in ("csv", "jsonl"):
+        outbox.send(message.answer("Формат выгрузки: csv или jsonl."))
+        return
+
+    kind = EXPORT_COMMANDS[command.command]
+    workdir = tempfile.mkdtemp(prefix="export-")
+    filename = f"{kind}.{fmt}"
+    try:
+        count = await export_file(kind, os.path.join(workdir, filename), fmt)
+    except Exception as e:
+        logger.error(f"Ошибка выгрузки: {e}")
+        shutil.rmtree(workdir, ignore_errors=True)
+        outbox.send(message.answer("❌ Ошибка выгрузки."))
+        return
+
+    sending = outbox.send(message.answer_document(
+        FSInputFile(os.path.join(workdir, filename), filename=filename),
+        caption=f"Примеров: {count}"
+    ))
+    # Файл нужен до конца отправки - удаляем каталог, когда очередь его отправит
+    sending.add_done_callback(lambda _: shutil.rmtree(workdir, ignore_errors=True))
\ No newline at end of file
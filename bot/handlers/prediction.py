@@ -3,60 +3,63 @@ from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import StateFilter
 from aiogram.fsm.state import State, StatesGroup
+from core.outbox import outbox
 from core.keyboards import get_exit_keyboard, get_main_keyboard
-from models.ai_model import AIModel
+from models.registry import registry
+from models.batching import prediction_batcher
 from core.config import config
 import logging
 
 logger = logging.getLogger(__name__)
 prediction_router = Router()
-ai_model = AIModel()
 
 class PredictionStates(StatesGroup):
     prediction_mode = State()
 
-@prediction_router.message(F.text == "Спросить")
+@prediction_router.message(F.text == "Спросить", flags={"models": True})
 async def start_prediction_mode(message: Message, state: FSMContext):
     """Начало режима предсказаний"""
+    ai_model = registry.ai_model
     if not ai_model.is_trained and not ai_model.load_model():
-        await message.answer(
+        outbox.send(message.answer(
             "Модель не обучена. Админ должен обучить модель.",
             reply_markup=get_main_keyboard(message.from_user.id in config.ADMIN_IDS)
-        )
+        ))
         return
     
-    await message.answer(
+    outbox.send(message.answer(
         "Режим вопрос-ответ активирован. Введите ваш вопрос:",
         reply_markup=get_exit_keyboard()
-    )
+    ))
     await state.set_state(PredictionStates.prediction_mode)
 
 @prediction_router.message(F.text == "Выход", StateFilter(PredictionStates.prediction_mode))
 async def exit_prediction_mode(message: Message, state: FSMContext):
     await state.clear()
-    await message.answer(
+    outbox.send(message.answer(
         "Режим вопрос-ответ завершен.",
         reply_markup=get_main_keyboard(message.from_user.id in config.ADMIN_IDS)
-    )
+    ))
 
-@prediction_router.message(StateFilter(PredictionStates.prediction_mode))
+@prediction_router.message(StateFilter(PredictionStates.prediction_mode), flags={"models": True})
 async def process_prediction(message: Message):
     """Обработка текста для предсказания"""
     if message.text == "Выход":
-        await message.answer(
+        outbox.send(message.answer(
             "Режим вопрос-ответ завершен.",
             reply_markup=get_main_keyboard(message.from_user.id in config.ADMIN_IDS)
-        )
+        ))
         return
     
+    ai_model = registry.ai_model
     if not ai_model.is_trained:
         if not ai_model.load_model():
-            await message.answer("Модель не обучена!")
+            outbox.send(message.answer("Модель не обучена!"))
             return
     
     try:
-        response = ai_model.predict(message.text)
-        await message.answer(response)
+        response = await prediction_batcher.submit(message.text)
+        outbox.send(message.answer(response))
     except Exception as e:
         logger.error(f"Ошибка предсказания: {e}")
-        await message.answer("Произошла ошибка при обработке запроса.")
\ No newline at end of file
+        outbox.send(message.answer("Произошла ошибка при обработке запроса."))
\ No newline at end of file
@@ -0,0 +1,159 @@
+import inspect
+import logging
+from types import SimpleNamespace
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.middlewares.manager import MiddlewareManager
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message
+from magic_filter import MagicFilter
+from magic_filter.operations import GetAttributeOperation
+
+logger = logging.getLogger(__name__)
+
+# Результат разбора фильтра для конкретных текста и состояния
+NO, YES, UNKNOWN = 0, 1, 2
+
+class ButtonIndexMiddleware(BaseMiddleware):
+    """Внешний middleware сообщений диспетчера: кнопки меню без перебора фильтров.
+
+    Индекс ``(состояние FSM, текст) -> обработчик`` строится при старте бота
+    по уже зарегистрированным обработчикам: для каждого текста кнопки и
+    каждого состояния роутеры проходятся в том же порядке, что и в aiogram,
+    и в индекс попадает только тот обработчик, который aiogram выбрал бы
+    наверняка. Если по дороге встретился фильтр, который нельзя вычислить
+    заранее (команда с нужным префиксом, фильтр по пользователю и т.п.),
+    ключ в индекс не попадает. Сообщения не из индекса (свободный текст)
+    идут обычным путем по цепочке фильтров.
+
+    Обработчик вызывается через внутренние middleware его роутеров (метрики,
+    готовность моделей), как и при обычной обработке. Обработчики из индекса
+    не должны пропускать событие через ``SkipHandler``.
+    """
+
+    def __init__(self, dispatcher, texts):
+        self.dispatcher = dispatcher
+        self.texts = set(texts)
+        self.index = {}
+
+    async def __call__(self, handler, event, data):
+        if isinstance(event, Message) and event.text is not None:
+            target = self.index.get((data.get("raw_state"), event.text))
+            if target is not None:
+                router, handler_object, middlewares = target
+                data["event_router"] = router
+                data["handler"] = handler_object
+                return await MiddlewareManager.wrap_middlewares(middlewares, handler_object.call)(event, data)
+        return await handler(event, data)
+
+    async def build(self):
+        """Строит индекс по роутерам диспетчера (вызывается при старте)"""
+        routers = list(self.dispatcher.chain_tail)
+        texts = self.texts | {text for router in routers for text in _text_constants(router)}
+        states = {None} | {state for router in routers for state in _referenced_states(router)}
+        index = {}
+        for raw_state in states:
+            for text in texts:
+                target = await self._resolve(routers, raw_state, text)
+                if target is not None:
+                    index[(raw_state, text)] = target
+        self.index = index
+        logger.info(f"Индекс кнопок: {len(index)} ключей ({len(texts)} текстов, {len(states)} состояний)")
+
+    async def _resolve(self, routers, raw_state, text):
+        """Обработчик, который aiogram выберет для текста в состоянии, или None, если заранее не известно"""
+        message = SimpleNamespace(text=text)
+        for router in routers:
+            observer = router.message
+            # Внешние middleware и общие фильтры роутеров могут повлиять на выбор - их не предсказываем
+            if observer._handler.filters or (router is not self.dispatcher and list(observer.outer_middleware)):
+                return None
+            for handler_object in observer.handlers:
+                verdict = YES
+                for filter_object in handler_object.filters or ():
+                    result = await _check(filter_object, message, raw_state)
+                    if result == NO:
+                        verdict = NO
+                        break
+                    if result == UNKNOWN:
+                        verdict = UNKNOWN
+                if verdict == UNKNOWN:
+                    return None
+                if verdict == YES:
+                    middlewares = [m for r in reversed(tuple(router.chain_head)) for m in r.message.middleware]
+                    return router, handler_object, middlewares
+        return None
+
+async def _check(filter_object, message, raw_state: str) -> int:
+    """Вычисляет фильтр для сообщения с текстом ``message.text`` в состоянии ``raw_state``"""
+    if filter_object.magic is not None:
+        if not _is_text_only(filter_object.magic):
+            return UNKNOWN
+        return YES if filter_object.magic.resolve(message) else NO
+    callback = filter_object.callback
+    if isinstance(callback, (State, StatesGroup, StateFilter)):
+        result = callback(message, raw_state=raw_state)
+        if inspect.isawaitable(result):
+            result = await result
+        return YES if result else NO
+    if isinstance(callback, Command):
+        # Команда начинается с префикса; текст без него команде не подходит
+        return UNKNOWN if message.text[:1] in callback.prefix else NO
+    return UNKNOWN
+
+def _is_text_only(magic: MagicFilter) -> bool:
+    """Фильтр вида ``F.text ...``, зависящий только от текста сообщения"""
+    operations = magic._operations
+    if not operations or not isinstance(operations[0], GetAttributeOperation) or operations[0].name != "text":
+        return False
+    for operation in operations[1:]:
+        # Вложенные магические фильтры могут обращаться к другим полям - такие не вычисляем
+        for name in ("right", "left", "args", "kwargs", "extractor", "inner"):
+            value = getattr(operation, name, None)
+            items = value.values() if isinstance(value, dict) else value if isinstance(value, tuple) else (value,)
+            if any(isinstance(item, MagicFilter) for item in items):
+                return False
+    return True
+
+def _text_constants(router) -> set:
+    """Строки, с которыми сравнивают текст фильтры роутера (``F.text == "..."``)"""
+    texts = set()
+    for handler_object in router.message.handlers:
+        for filter_object in handler_object.filters or ():
+            if filter_object.magic is not None and _is_text_only(filter_object.magic):
+                for operation in filter_object.magic._operations[1:]:
+                    if isinstance(getattr(operation, "right", None), str):
+                        texts.add(operation.right)
+    return texts
+
+def _referenced_states(router) -> set:
+    """Состояния FSM, упомянутые в фильтрах роутера"""
+    states = set()
+
+    def add(value):
+        if isinstance(value, State):
+            states.add(value.state)
+        elif isinstance(value, str):
+            states.add(value)
+        elif isinstance(value, StatesGroup):
+            states.update(type(value).__all_states_names__)
+        elif inspect.isclass(value) and issubclass(value, StatesGroup):
+            states.update(value.__all_states_names__)
+
+    for handler_object in router.message.handlers:
+        for filter_object in handler_object.filters or ():
+            callback = filter_object.callback
+            if isinstance(callback, StateFilter):
+                for value in callback.states:
+                    add(value)
+            elif isinstance(callback, (State, StatesGroup)):
+                add(callback)
+    states.discard("*")
+    return states
+
+def setup_button_index(dp, texts) -> ButtonIndexMiddleware:
+    """Подключает индекс кнопок последним внешним middleware сообщений; индекс строится при старте"""
+    middleware = ButtonIndexMiddleware(dp, texts)
+    dp.message.outer_middleware(middleware)
+    dp.startup.register(middleware.build)
+    return middleware
@@ -0,0 +1,30 @@
+import time
+from aiogram import BaseMiddleware
+from core.metrics import handler_errors, handler_latency
+from core.tracing import current_trace
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Замеряет время обработчиков роутера (внутренний middleware: только сработавшие обработчики).
+
+    В трассировке обновления это фаза ``handler``.
+    """
+
+    def __init__(self, router_name: str):
+        self.router_name = router_name
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        trace = current_trace.get()
+        started = time.perf_counter()
+        try:
+            if trace is None:
+                return await handler(event, data)
+            trace.handler = f"{self.router_name}.{name}"
+            with trace.phase("handler"):
+                return await handler(event, data)
+        except Exception:
+            handler_errors.inc(router=self.router_name, handler=name)
+            raise
+        finally:
+            handler_latency.observe(time.perf_counter() - started, router=self.router_name, handler=name)
\ No newline at end of file
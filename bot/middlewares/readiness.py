@@ -0,0 +1,18 @@
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message
+from core.outbox import outbox
+from models.messages import WARMING_UP_RESPONSE
+from models.registry import registry
+
+class ReadinessMiddleware(BaseMiddleware):
+    """Пока модели загружаются, обработчики с флагом ``models`` отвечают заглушкой; меню работает сразу"""
+
+    async def __call__(self, handler, event, data):
+        if get_flag(data, "models") and not registry.ready.is_set():
+            if isinstance(event, Message):
+                outbox.send(event.answer(WARMING_UP_RESPONSE))
+            elif isinstance(event, CallbackQuery):
+                await event.answer(WARMING_UP_RESPONSE)
+            return
+        return await handler(event, data)
@@ -0,0 +1,79 @@
+import logging
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from core.config import config
+from core.metrics import update_latency
+from core.tracing import PHASES, Trace, current_trace, phase
+
+logger = logging.getLogger("bot.slow")
+
+class TracingMiddleware(BaseMiddleware):
+    """Внешний middleware обновлений: заводит трассировку и пишет медленные обновления в лог.
+
+    Должен стоять первым в ``dp.update.outer_middleware``, чтобы в трассировку
+    попало и чтение состояния FSM. Обновление дольше ``slow_ms`` миллисекунд
+    попадает в лог ``bot.slow`` с разбивкой по фазам. Фазы записываются, когда
+    отправлены и ответы обработчика из очереди ``core.outbox``.
+    """
+
+    def __init__(self, slow_ms: float):
+        self.slow_ms = slow_ms
+
+    async def __call__(self, handler, event, data):
+        trace = Trace(getattr(event, "update_id", None))
+        data["trace"] = trace
+        token = current_trace.set(trace)
+        try:
+            return await handler(event, data)
+        finally:
+            current_trace.reset(token)
+            trace.on_finish(lambda total: self.report(trace, total))
+
+    def report(self, trace: Trace, total: float):
+        for name, value in trace.phases.items():
+            update_latency.observe(value, phase=name)
+        if self.slow_ms and total * 1000 >= self.slow_ms:
+            self.log_slow(trace, total)
+
+    @staticmethod
+    def log_slow(trace: Trace, total: float):
+        breakdown = {name: round(trace.phases[name] * 1000, 2) for name in PHASES}
+        logger.warning(
+            "Медленное обновление %s: %.0f мс, обработчик %s (%s)",
+            trace.update_id, total * 1000, trace.handler or "-",
+            ", ".join(f"{name}={value:.1f}" for name, value in breakdown.items()),
+            extra={
+                "trace_id": trace.trace_id,
+                "update_id": trace.update_id,
+                "handler": trace.handler,
+                "duration_ms": round(total * 1000, 2),
+                "phases_ms": breakdown,
+            }
+        )
+
+class FilterTimingMiddleware(BaseMiddleware):
+    """Внешний middleware типа события: время между ним и обработчиком - проверка фильтров"""
+
+    async def __call__(self, handler, event, data):
+        with phase("filters"):
+            return await handler(event, data)
+
+class ApiTimingMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время запросов к Telegram API"""
+
+    async def __call__(self, make_request, bot, method):
+        with phase("api"):
+            return await make_request(bot, method)
+
+def setup_tracing(dp, slow_ms: float = config.SLOW_UPDATE_MS):
+    """Подключает трассировку к диспетчеру (бот подключается через ``ApiTimingMiddleware``)"""
+    # Ставим трассировку перед встроенными middleware (ошибки, контекст, FSM)
+    builtin = list(dp.update.outer_middleware)
+    for middleware in builtin:
+        dp.update.outer_middleware.unregister(middleware)
+    dp.update.outer_middleware(TracingMiddleware(slow_ms))
+    for middleware in builtin:
+        dp.update.outer_middleware(middleware)
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.outer_middleware(FilterTimingMiddleware())
\ No newline at end of file
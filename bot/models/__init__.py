@@ -1,2 +1,13 @@
-from .ai_model import AIModel
-from .chat_model import ChatModel
\ No newline at end of file
+from .registry import ModelRegistry, registry
+from .training import TrainingExecutor, trainer
+from .batching import BatchScheduler, prediction_batcher, chat_batcher
+
+def __getattr__(name):
+    # Классы моделей тянут sklearn - импортируем их только по требованию
+    if name == 'AIModel':
+        from .ai_model import AIModel
+        return AIModel
+    if name == 'ChatModel':
+        from .chat_model import ChatModel
+        return ChatModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
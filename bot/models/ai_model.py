@@ -1,135 +1,214 @@
 import os
-import json
+import time
 import logging
+import threading
 from pathlib import Path
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
 import joblib
 from core.config import config
+from core.metrics import exact_matches, inference_latency
+from .corpus import TrainingCorpus, training_corpus
+from .incremental import OnlineCentroidClassifier, make_hashing_vectorizer
+from .backends import BACKENDS, select_backend
+from .artifacts import artifact_exists, dump_vectorizer, load_artifact, restore_vectorizer, save_artifact
+from .messages import ERROR_RESPONSE
+from .registry import registry
 
 logger = logging.getLogger(__name__)
 
 class AIModel:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(lowercase=True)  # Добавляем lowercase=True
-        self.classifier = RandomForestClassifier()
+        # "batch" - TF-IDF + лес с полным переобучением, "incremental" - дообучение на каждом примере
+        self.mode = config.AI_MODEL_MODE
+        if self.mode == 'incremental':
+            self.vectorizer = make_hashing_vectorizer(config.INCREMENTAL_N_FEATURES)
+            self.classifier = OnlineCentroidClassifier()
+        else:
+            self.vectorizer = TfidfVectorizer(lowercase=True)  # Добавляем lowercase=True
+            self.classifier = None  # Скомпилированный движок классификатора (см. models.backends)
+        # Настроенный классификатор режима batch ("auto" - выбор при обучении) и фактически обученный
+        self.backend = config.AI_MODEL_BACKEND
+        self.backend_name = None
+        self.selection = []  # Отчет автовыбора: кандидаты с точностью, задержкой и памятью
         self.label_to_index = {}
         self.index_to_label = {}
         self.is_trained = False
-        self.original_texts = []  # Сохраняем оригинальные тексты для точного совпадения
+        self.fitted_count = 0  # Сколько примеров корпуса учтено инкрементальной моделью
+        self._fit_lock = threading.Lock()  # Дообучение идет и из обработчиков, и из импорта, и по событиям других процессов
+        self.corpus = training_corpus
         
         os.makedirs(config.MODEL_PATH, exist_ok=True)
         os.makedirs(os.path.dirname(config.TRAINING_DATA_PATH), exist_ok=True)
         self.load_data()
 
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Нормализует текст для поиска точного совпадения"""
+        return TrainingCorpus.normalize(text)
+
     def load_data(self):
-        """Загружает данные из файла, сохраняя оригинальные тексты"""
-        try:
-            if os.path.exists(config.TRAINING_DATA_PATH):
-                with open(config.TRAINING_DATA_PATH, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if not isinstance(data, dict) or 'texts' not in data or 'labels' not in data:
-                        raise ValueError("Invalid data format")
-                    # Сохраняем оригинальные тексты и их нижний регистр
-                    self.original_texts = data['texts']
-                    self.lower_texts = [text.lower() for text in data['texts']]
-                    return {"texts": self.lower_texts, "labels": data['labels']}
-        except Exception as e:
-            logger.error(f"Ошибка загрузки данных: {e}")
-    
-        self.original_texts = []
-        self.lower_texts = []
-        return {"texts": [], "labels": []}
+        """Возвращает корпус из памяти (см. ``TrainingCorpus``)"""
+        return self.corpus.load_data()
 
     def predict(self, text: str) -> str:
         """Предсказывает метку для текста (нечувствителен к регистру)"""
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts: list) -> list:
+        """Предсказывает метки для пачки текстов одним вызовом классификатора"""
         if not self.is_trained:
             raise ValueError("Модель не обучена")
         
         try:
-            text_lower = text.lower()
-            data = self.load_data()
+            texts_lower = [self._normalize(text) for text in texts]
+            self.load_data()
             
             # Проверка точного совпадения (без учета регистра)
-            for i, lower_text in enumerate(self.lower_texts):
-                if text_lower == lower_text:
-                    return data['labels'][i]
+            results = [self.corpus.lookup(text_lower) for text_lower in texts_lower]
+            misses = [i for i, label in enumerate(results) if label is None]
+            exact_matches.inc(len(texts) - len(misses), model='ai', result='hit')
+            exact_matches.inc(len(misses), model='ai', result='miss')
             
-            # Если нет точного совпадения - используем модель
-            X = self.vectorizer.transform([text_lower])
-            predicted_idx = self.classifier.predict(X)[0]
-            return self.index_to_label.get(predicted_idx, "Извините, я не знаю ответа на этот вопрос.")
+            # Для остальных текстов используем модель - одна разреженная матрица на всю пачку
+            if misses:
+                started = time.perf_counter()
+                X = self.vectorizer.transform([texts_lower[i] for i in misses])
+                vectorized = time.perf_counter()
+                predicted = self.classifier.predict(X)
+                inference_latency.observe(vectorized - started, model='ai', phase='vectorize')
+                inference_latency.observe(time.perf_counter() - vectorized, model='ai', phase='classify')
+                for i, predicted_idx in zip(misses, predicted):
+                    results[i] = self.index_to_label.get(predicted_idx, "Извините, я не знаю ответа на этот вопрос.")
+            return results
         except Exception as e:
             logger.error(f"Ошибка предсказания: {e}")
-            return "Произошла ошибка при обработке запроса."
+            return [ERROR_RESPONSE] * len(texts)
+
+    @property
+    def model_file(self) -> str:
+        name = "model_incremental.joblib" if self.mode == 'incremental' else "model.joblib"
+        return f"{config.MODEL_PATH}/{name}"
+
+    @property
+    def artifact_path(self) -> str:
+        """Каталог артефакта с массивами леса и idf (только для режима batch)"""
+        return f"{config.MODEL_PATH}/model"
 
     def load_model(self):
         """Загружает модель с диска"""
         try:
-            if os.path.exists(f"{config.MODEL_PATH}/model.joblib"):
-                model_data = joblib.load(f"{config.MODEL_PATH}/model.joblib")
+            if self.mode != 'incremental' and artifact_exists(self.artifact_path):
+                # Массивы отображаются в память: загрузка без десериализации и копирования
+                meta, arrays = load_artifact(self.artifact_path)
+                self.vectorizer = restore_vectorizer(meta, arrays)
+                # Артефакты без имени классификатора сохранены до появления выбора - это лес
+                self.backend_name = meta.get('backend', 'forest')
+                self.selection = meta.get('selection', [])
+                self.classifier = BACKENDS[self.backend_name].load(arrays, meta['n_features'])
+                self.label_to_index = meta['label_to_index']
+                self.index_to_label = meta['index_to_label']
+                self.is_trained = True
+                logger.info("Модель успешно загружена")
+                return True
+            if os.path.exists(self.model_file):
+                model_data = joblib.load(self.model_file)
                 self.vectorizer = model_data['vectorizer']
                 self.classifier = model_data['classifier']
                 self.label_to_index = model_data['label_to_index']
                 self.index_to_label = model_data['index_to_label']
+                self.fitted_count = model_data.get('fitted_count', 0)
                 self.is_trained = True
                 logger.info("Модель успешно загружена")
+                if self.mode == 'incremental':
+                    return self._catch_up()
                 return True
+            if self.mode == 'incremental':
+                # Инкрементальная модель строится из корпуса за один проход
+                return self.train()
         except Exception as e:
             logger.error(f"Ошибка загрузки модели: {e}")
         return False
 
-    def save_data(self, data):
-        """Сохраняет данные в файл"""
-        try:
-            with open(config.TRAINING_DATA_PATH, 'w', encoding='utf-8') as f:
-                # Сохраняем оригинальные тексты
-                json.dump({"texts": self.original_texts, "labels": data['labels']}, 
-                          f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"Ошибка сохранения данных: {e}")
+    def partial_fit(self, texts: list, labels: list):
+        """Дообучает инкрементальную модель на новых примерах"""
+        y = []
+        for label in labels:
+            idx = self.label_to_index.get(label)
+            if idx is None:
+                idx = len(self.label_to_index)
+                self.label_to_index[label] = idx
+                self.index_to_label[idx] = label
+            y.append(idx)
+        self.classifier.partial_fit(self.vectorizer.transform(texts), y)
+        self.fitted_count += len(texts)
+        self.is_trained = True
+
+    def _catch_up(self):
+        """Учитывает в инкрементальной модели примеры корпуса, добавленные после ее обучения"""
+        with self._fit_lock:
+            data = self.corpus.rows_since(self.fitted_count)
+            if data is None:
+                # Корпус стал короче, чем при обучении - его заменили, нужен полный проход
+                return self.train()
+            if data['texts']:
+                self.partial_fit(data['texts'], data['labels'])
+            return True
+
+    def catch_up(self) -> bool:
+        """Дообучение примерами из хранилища (добавленными другими процессами)"""
+        self.corpus.load_data(wait=True)
+        return self._catch_up()
 
     def add_training_data(self, text: str, label: str):
         """Добавляет новые данные для обучения"""
-        text_lower = text.lower()
-        data = self.load_data()
-        
-        # Проверяем на дубликаты (без учета регистра)
-        if text_lower in self.lower_texts:
-            return False
-            
-        self.original_texts.append(text)
-        self.lower_texts.append(text_lower)
-        data['texts'].append(text_lower)
-        data['labels'].append(label)
-        
-        try:
-            with open(config.TRAINING_DATA_PATH, 'w', encoding='utf-8') as f:
-                json.dump({"texts": self.original_texts, "labels": data['labels']}, 
-                        f, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка сохранения данных: {e}")
-            return False
+        added = self.corpus.add(text, label)
+        if added and self.mode == 'incremental':
+            self._catch_up()
+            registry.examples_added('ai')
+        return added
+
+    def add_training_rows(self, rows) -> int:
+        """Массово добавляет пары (текст, метка); возвращает число новых примеров"""
+        added = self.corpus.add_many(rows)
+        if added and self.mode == 'incremental':
+            self._catch_up()
+            registry.examples_added('ai')
+        return added
 
     def train(self):
         """Обучает модель"""
         try:
-            data = self.load_data()
+            data = self.corpus.copy_data()
             texts = data['texts']
             labels = data['labels']
             
-            if len(texts) < 10:
-                raise ValueError("Нужно минимум 10 примеров")
-            if len(set(labels)) < 2:
-                raise ValueError("Нужно минимум 2 разных метки")
-            
-            self.label_to_index = {label: idx for idx, label in enumerate(set(labels))}
-            self.index_to_label = {idx: label for label, idx in self.label_to_index.items()}
-            
-            y = [self.label_to_index[label] for label in labels]
-            X = self.vectorizer.fit_transform(texts)
-            self.classifier.fit(X, y)
+            if self.mode == 'incremental':
+                # Полный проход нужен только для качества: модель строится заново из корпуса
+                if not texts:
+                    raise ValueError("Нет данных для обучения")
+                self.classifier = OnlineCentroidClassifier()
+                self.label_to_index = {}
+                self.index_to_label = {}
+                self.fitted_count = 0
+                self.partial_fit(texts, labels)
+            else:
+                if len(texts) < 10:
+                    raise ValueError("Нужно минимум 10 примеров")
+                if len(set(labels)) < 2:
+                    raise ValueError("Нужно минимум 2 разных метки")
+                
+                self.label_to_index = {label: idx for idx, label in enumerate(set(labels))}
+                self.index_to_label = {idx: label for label, idx in self.label_to_index.items()}
+                
+                y = [self.label_to_index[label] for label in labels]
+                X = self.vectorizer.fit_transform(texts)
+                # Оценщик sklearn сразу компилируется: предсказания идут через плоские массивы
+                if self.backend == 'auto':
+                    self.backend_name, self.classifier, self.selection = select_backend(self.vectorizer, texts, X, y)
+                else:
+                    self.backend_name = self.backend
+                    self.classifier = BACKENDS[self.backend].fit(X, y)
+                    self.selection = []
             self.is_trained = True
             
             self.save_model()
@@ -140,13 +219,28 @@ class AIModel:
 
     def save_model(self):
         """Сохраняет модель на диск"""
+        if self.mode != 'incremental':
+            meta, arrays = dump_vectorizer(self.vectorizer)
+            meta.update({
+                'backend': self.backend_name,
+                'selection': self.selection,
+                'n_features': self.classifier.n_features,
+                'label_to_index': self.label_to_index,
+                'index_to_label': self.index_to_label
+            })
+            arrays.update(self.classifier.to_arrays())
+            save_artifact(self.artifact_path, meta, arrays)
+            return
+
+        # Центроиды инкрементальной модели - изменяемые словари, их храним в joblib
         model_data = {
             'vectorizer': self.vectorizer,
             'classifier': self.classifier,
             'label_to_index': self.label_to_index,
-            'index_to_label': self.index_to_label
+            'index_to_label': self.index_to_label,
+            'fitted_count': self.fitted_count
         }
-        joblib.dump(model_data, f"{config.MODEL_PATH}/model.joblib")
+        joblib.dump(model_data, self.model_file)
 
     def get_status(self):
         """Возвращает статус модели"""
@@ -154,6 +248,9 @@ class AIModel:
         vocab_size = len(self.vectorizer.vocabulary_) if hasattr(self.vectorizer, 'vocabulary_') else 0
         
         return {
+            'mode': self.mode,
+            'backend': self.backend_name if self.mode != 'incremental' else 'centroid',
+            'auto': self.backend == 'auto' and self.mode != 'incremental',
             'is_trained': self.is_trained,
             'num_classes': len(self.label_to_index),
             'vocab_size': vocab_size,
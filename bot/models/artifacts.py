@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import joblib
+import numpy as np
+from pathlib import Path
+from sklearn.base import clone
+
+META_FILE = "meta.joblib"
+
+def save_artifact(path, meta: dict, arrays: dict):
+    """Сохраняет артефакт модели: каталог с метаданными и сырыми массивами ``.npy``.
+
+    ``path`` - символическая ссылка на каталог версии рядом с ней. Новая
+    версия пишется в свой каталог, затем ссылка атомарно подменяется
+    (``os.replace``), так что читатели в любой момент видят либо старый, либо
+    новый артефакт целиком. Предыдущая версия остается на диске до следующего
+    сохранения: процессы, которые как раз ее загружают или уже отобразили
+    файлы в память, дочитывают их без ошибок.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    version_path = Path(tempfile.mkdtemp(prefix=f"{path.name}.v", dir=path.parent))
+    for name, array in arrays.items():
+        np.save(version_path / f"{name}.npy", np.ascontiguousarray(array), allow_pickle=False)
+    joblib.dump(meta, version_path / META_FILE)
+
+    previous = None
+    if path.is_symlink():
+        previous = path.parent / os.readlink(path)
+    elif path.exists():
+        # Каталог старого формата (без ссылки): разовый перенос в каталог версии
+        previous = Path(tempfile.mkdtemp(prefix=f"{path.name}.v", dir=path.parent))
+        os.replace(path, previous)
+    link_path = path.with_name(path.name + ".link")
+    if link_path.is_symlink() or link_path.exists():
+        link_path.unlink()
+    os.symlink(version_path.name, link_path)
+    os.replace(link_path, path)
+
+    # Оставляем текущую и предыдущую версии, более старые удаляем
+    for stale in path.parent.glob(f"{path.name}.v*"):
+        if stale not in (version_path, previous):
+            shutil.rmtree(stale, ignore_errors=True)
+    shutil.rmtree(path.with_name(path.name + ".tmp"), ignore_errors=True)
+    shutil.rmtree(path.with_name(path.name + ".old"), ignore_errors=True)
+
+def load_artifact(path, mmap_mode: str = 'r'):
+    """Загружает артефакт: (метаданные, массивы), отображенные в память только для чтения.
+
+    Страницы отображенных файлов общие для всех процессов хоста через
+    page cache, а загрузка не копирует массивы.
+    """
+    # Ссылка разрешается один раз: метаданные и массивы берутся из одной версии
+    path = Path(path).resolve()
+    meta = joblib.load(path / META_FILE)
+    # np.asarray снимает подкласс memmap (его индексация заметно медленнее), данные остаются отображенными
+    arrays = {
+        file.stem: np.asarray(np.load(file, mmap_mode=mmap_mode, allow_pickle=False))
+        for file in path.glob("*.npy")
+    }
+    return meta, arrays
+
+def artifact_exists(path) -> bool:
+    return (Path(path) / META_FILE).exists()
+
+def artifact_size(path) -> int:
+    """Размер артефакта на диске в байтах"""
+    path = Path(path)
+    if path.is_dir():
+        return sum(file.stat().st_size for file in path.iterdir())
+    return path.stat().st_size if path.exists() else 0
+
+def dump_vectorizer(vectorizer, prefix: str = "vectorizer"):
+    """Раскладывает TF-IDF векторизатор на (метаданные, массивы): словарь в метаданных, idf - массивом"""
+    meta = {
+        f"{prefix}_params": clone(vectorizer),
+        f"{prefix}_vocabulary": dict(vectorizer.vocabulary_),
+    }
+    arrays = {f"{prefix}_idf": vectorizer.idf_}
+    return meta, arrays
+
+def restore_vectorizer(meta: dict, arrays: dict, prefix: str = "vectorizer"):
+    """Собирает векторизатор обратно; idf остается отображенным в память"""
+    vectorizer = meta[f"{prefix}_params"]
+    vectorizer.vocabulary_ = meta[f"{prefix}_vocabulary"]
+    vectorizer.idf_ = arrays[f"{prefix}_idf"]
+    return vectorizer
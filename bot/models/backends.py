@@ -0,0 +1,186 @@
+import time
+import logging
+import numpy as np
+from core.config import config
+from .forest import FlatForest
+
+logger = logging.getLogger(__name__)
+
+class LinearModel:
+    """Линейная модель в плоских массивах: класс с максимальным ``X @ weights.T + bias``.
+
+    Так обслуживаются линейный SVM, логистическая регрессия, complement
+    Naive Bayes и ближайший центроид. Массивы, как и у ``FlatForest``, можно
+    отобразить в память из артефакта. Для двух классов SVM и регрессия
+    хранят одну строку весов: положительный счет - второй класс, как в sklearn.
+    """
+
+    ARRAYS = ('weights', 'bias', 'classes')
+
+    def __init__(self, weights, bias, classes, n_features: int = None):
+        self.weights = weights
+        self.bias = bias
+        self.classes = classes
+        self.n_features = n_features if n_features is not None else weights.shape[1]
+
+    def to_arrays(self) -> dict:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, n_features: int):
+        return cls(**{name: arrays[name] for name in cls.ARRAYS}, n_features=n_features)
+
+    def decision_function(self, X):
+        return np.asarray(X @ self.weights.T) + self.bias
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:
+            return self.classes.take((scores[:, 0] > 0).astype(int))
+        return self.classes.take(np.argmax(scores, axis=1))
+
+def _linear(estimator) -> LinearModel:
+    """SVM и логистическая регрессия: веса и свободный член как есть"""
+    return LinearModel(
+        np.ascontiguousarray(estimator.coef_, dtype=np.float64),
+        np.asarray(estimator.intercept_, dtype=np.float64),
+        np.asarray(estimator.classes_),
+    )
+
+def _complement_nb(estimator) -> LinearModel:
+    """Complement NB: правдоподобие - скалярное произведение с логарифмами весов признаков"""
+    weights = np.ascontiguousarray(estimator.feature_log_prob_, dtype=np.float64)
+    return LinearModel(weights, np.zeros(weights.shape[0]), np.asarray(estimator.classes_))
+
+def _nearest_centroid(estimator) -> LinearModel:
+    """Ближайший центроид: argmin ||x - c||^2 = argmax (2 x.c - ||c||^2)"""
+    centroids = np.asarray(estimator.centroids_, dtype=np.float64)
+    return LinearModel(
+        np.ascontiguousarray(2 * centroids), -np.einsum('ij,ij->i', centroids, centroids),
+        np.asarray(estimator.classes_),
+    )
+
+def _make_forest():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(
+        n_estimators=config.AI_FOREST_TREES, max_depth=config.AI_FOREST_MAX_DEPTH or None, n_jobs=1
+    )
+
+def _make_linear_svm():
+    from sklearn.svm import LinearSVC
+    return LinearSVC()
+
+def _make_logreg():
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(max_iter=1000)
+
+def _make_complement_nb():
+    from sklearn.naive_bayes import ComplementNB
+    return ComplementNB()
+
+def _make_nearest_centroid():
+    from sklearn.neighbors import NearestCentroid
+    return NearestCentroid()
+
+class Backend:
+    """Классификатор режима batch: оценщик sklearn для обучения и движок для предсказаний"""
+
+    def __init__(self, name: str, make_estimator, compile_estimator, engine):
+        self.name = name
+        self.make_estimator = make_estimator
+        self.compile_estimator = compile_estimator
+        self.engine = engine
+
+    def fit(self, X, y):
+        """Обучает оценщик и компилирует его в движок"""
+        return self.compile_estimator(self.make_estimator().fit(X, y))
+
+    def load(self, arrays: dict, n_features: int):
+        return self.engine.from_arrays(arrays, n_features)
+
+BACKENDS = {
+    backend.name: backend for backend in (
+        Backend('forest', _make_forest, FlatForest.from_sklearn, FlatForest),
+        Backend('linear_svm', _make_linear_svm, _linear, LinearModel),
+        Backend('logreg', _make_logreg, _linear, LinearModel),
+        Backend('complement_nb', _make_complement_nb, _complement_nb, LinearModel),
+        Backend('nearest_centroid', _make_nearest_centroid, _nearest_centroid, LinearModel),
+    )
+}
+
+def engine_size(engine) -> int:
+    """Память массивов движка в байтах"""
+    return sum(array.nbytes for array in engine.to_arrays().values())
+
+def cross_validate(backend: Backend, X, y, folds: int, seed: int = 0) -> float:
+    """Средняя точность на ``folds`` разбиениях (KFold с перемешиванием)"""
+    from sklearn.model_selection import KFold
+
+    y = np.asarray(y)
+    scores = []
+    for train_index, test_index in KFold(n_splits=folds, shuffle=True, random_state=seed).split(X):
+        if len(np.unique(y[train_index])) < 2:
+            continue
+        engine = backend.fit(X[train_index], y[train_index])
+        scores.append(float(np.mean(engine.predict(X[test_index]) == y[test_index])))
+    return float(np.mean(scores)) if scores else 0.0
+
+def measure_latency(engine, vectorizer, texts: list, samples: int = 200) -> float:
+    """p99 задержки одиночного запроса (векторизация и классификатор), секунды"""
+    times = []
+    for text in texts[:samples]:
+        started = time.perf_counter()
+        engine.predict(vectorizer.transform([text]))
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return times[min(len(times) - 1, int(0.99 * len(times)))] if times else 0.0
+
+def select_backend(vectorizer, texts: list, X, y, candidates=None):
+    """Автовыбор классификатора: (имя, обученный движок, отчет по кандидатам).
+
+    Каждый кандидат проходит кросс-валидацию, затем обучается на всем
+    корпусе; у обученного движка замеряются p99 одиночного запроса и память.
+    Побеждает самый точный кандидат в пределах ``AI_AUTO_P99_MS`` и
+    ``AI_AUTO_MEMORY_MB``; если в бюджеты не укладывается никто - самый быстрый.
+    """
+    candidates = candidates or [name.strip() for name in config.AI_AUTO_CANDIDATES.split(",") if name.strip()]
+    folds = max(2, min(config.AI_AUTO_FOLDS, X.shape[0]))
+    rng = np.random.default_rng(0)
+    sample = [texts[i] for i in rng.permutation(len(texts))[:200]]
+    report, engines = [], {}
+    for name in candidates:
+        backend = BACKENDS[name]
+        try:
+            started = time.perf_counter()
+            accuracy = cross_validate(backend, X, y, folds)
+            engine = backend.fit(X, y)
+            fit_seconds = time.perf_counter() - started
+        except Exception as e:
+            logger.error(f"Ошибка обучения кандидата {name}: {e}")
+            continue
+        p99 = measure_latency(engine, vectorizer, sample)
+        memory = engine_size(engine)
+        engines[name] = engine
+        report.append({
+            'backend': name,
+            'accuracy': round(accuracy, 4),
+            'p99_ms': round(p99 * 1000, 3),
+            'memory_mb': round(memory / 2 ** 20, 2),
+            'fit_seconds': round(fit_seconds, 2),
+            'fits_budget': p99 * 1000 <= config.AI_AUTO_P99_MS and memory / 2 ** 20 <= config.AI_AUTO_MEMORY_MB,
+        })
+        logger.info(
+            f"Кандидат {name}: точность {accuracy:.3f}, p99 {p99 * 1000:.2f} мс, "
+            f"память {memory / 2 ** 20:.1f} МБ, обучение {fit_seconds:.1f} с"
+        )
+    if not report:
+        raise ValueError("Ни один классификатор не обучился")
+
+    fitting = [item for item in report if item['fits_budget']]
+    if fitting:
+        best = max(fitting, key=lambda item: (item['accuracy'], -item['p99_ms']))
+    else:
+        best = min(report, key=lambda item: item['p99_ms'])
+        logger.warning(f"Ни один классификатор не укладывается в бюджеты, выбран самый быстрый: {best['backend']}")
+    logger.info(f"Выбран классификатор {best['backend']}")
+    return best['backend'], engines[best['backend']], report
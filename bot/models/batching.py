@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from core.config import config
+from core.metrics import metrics
+from core.tracing import phase
+from .registry import registry
+from .cache import ResponseCache
+from .corpus import TrainingCorpus, training_corpus, chat_corpus
+from .messages import ERROR_RESPONSE
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин размера пачки, запросов
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+batch_size = metrics.histogram(
+    "bot_batch_size", "Число запросов в пачке инференса", ("model",), BATCH_SIZE_BUCKETS
+)
+batch_window = metrics.gauge("bot_batch_window_seconds", "Окно сбора пачки инференса", ("model",))
+
+class BatchScheduler:
+    """Собирает одновременные запросы к модели в пачки.
+
+    Запросы, пришедшие в течение ``window_ms`` миллисекунд (или пока не
+    наберется ``max_batch`` штук), обрабатываются одним вызовом
+    ``predict_batch`` в отдельном потоке, а результаты раздаются ожидающим
+    обработчикам. Пока пачка считается, новые запросы копятся в следующую.
+
+    С ``cache`` ответы на повторяющиеся тексты отдаются сразу из
+    ``ResponseCache``, не попадая в пачку. Ключ - ``normalize(text)``,
+    версия - ``version()``; ответы из ``no_cache`` не кэшируются.
+    """
+
+    def __init__(self, name: str, predict_batch, window_ms: float, max_batch: int,
+                 cache: ResponseCache = None, normalize=None, version=None, no_cache=()):
+        self.name = name
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._predict_batch = predict_batch
+        self.cache = cache
+        self._normalize = normalize
+        self._version = version
+        self._no_cache = set(no_cache)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batch-{name}")
+        self._pending = []
+        self._timer = None
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+        self.last_batch_size = 0
+
+    async def submit(self, text: str):
+        """Ставит текст в очередь и ждет результата его пачки"""
+        key = version = None
+        if self.cache is not None:
+            key, version = self._normalize(text), self._version()
+            found, result = self.cache.get(key, version)
+            if found:
+                return result
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, key, version))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        # Ожидание пачки и сам расчет - фаза inference трассировки обновления
+        with phase("inference"):
+            return await future
+
+    def _flush(self):
+        """Отправляет накопленные запросы на обработку"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Цикл событий держит задачи слабыми ссылками - храним их до завершения
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        texts = [text for text, *_ in batch]
+        self.batches += 1
+        self.items += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_seen_batch = max(self.max_seen_batch, len(batch))
+        batch_size.observe(len(batch), model=self.name)
+        batch_window.set(self.window_ms / 1000, model=self.name)
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._executor, self._predict_batch, texts)
+        except Exception as e:
+            logger.error(f"Ошибка пакетной обработки '{self.name}': {e}")
+            for _, future, *_ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, key, version), result in zip(batch, results):
+            if self.cache is not None and result not in self._no_cache:
+                self.cache.put(key, version, result)
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Метрики пакетной обработки"""
+        return {
+            'window_ms': self.window_ms,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+            'max_seen_batch': self.max_seen_batch,
+            'last_batch_size': self.last_batch_size,
+            'pending': len(self._pending),
+        }
+
+def _predict_batch(texts):
+    return registry.ai_model.predict_batch(texts)
+
+def _chat_batch(texts):
+    return registry.chat_model.get_responses(texts)
+
+def _ai_version():
+    # Без блокировки и чтения хранилища: правки других процессов дочитывает poll_corpora
+    return registry.versions['ai'], training_corpus.version
+
+def _chat_version():
+    return registry.versions['chat'], chat_corpus.version
+
+def _poll_corpora():
+    training_corpus.load_data()
+    chat_corpus.load_examples()
+
+async def poll_corpora(interval: float):
+    """Фоновая задача: раз в ``interval`` секунд дочитывает правки корпусов из других процессов.
+
+    Чтение хранилища идет в отдельном потоке, поэтому ни цикл событий, ни
+    ``submit`` не ждут блокировку корпуса; новые записи меняют ``version``
+    и тем самым сбрасывают кэш ответов.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(_poll_corpora)
+        except Exception as e:
+            logger.error(f"Ошибка чтения корпусов: {e}")
+        await asyncio.sleep(interval)
+
+def _make_cache():
+    if config.RESPONSE_CACHE_SIZE <= 0:
+        return None
+    return ResponseCache(config.RESPONSE_CACHE_SIZE, config.RESPONSE_CACHE_TTL)
+
+prediction_batcher = BatchScheduler(
+    'ai', _predict_batch, config.BATCH_WINDOW_MS, config.BATCH_MAX_SIZE,
+    cache=_make_cache(), normalize=TrainingCorpus.normalize, version=_ai_version,
+    no_cache=(ERROR_RESPONSE,)
+)
+chat_batcher = BatchScheduler(
+    'chat', _chat_batch, config.BATCH_WINDOW_MS, config.BATCH_MAX_SIZE,
+    cache=_make_cache(), normalize=lambda text: text.lower().strip(), version=_chat_version,
+    no_cache=(ERROR_RESPONSE,)
+)
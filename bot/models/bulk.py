@@ -0,0 +1,156 @@
+import asyncio
+import csv
+import json
+import time
+import logging
+from itertools import islice
+from core.config import config
+from .corpus import chat_corpus, training_corpus
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+# Корпус -> названия полей (заголовок CSV и ключи JSONL)
+FIELDS = {
+    'training': ('text', 'label'),
+    'chat': ('question', 'answer'),
+}
+# Заголовки, которые узнаются в первой строке CSV (по-русски тоже)
+HEADERS = {('text', 'label'), ('question', 'answer'), ('вопрос', 'ответ'), ('текст', 'метка')}
+EXTENSIONS = {'.csv': 'csv', '.tsv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+def detect_format(filename: str):
+    """Формат файла по расширению: csv, jsonl или None"""
+    name = (filename or "").lower()
+    for extension, fmt in EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    return None
+
+def _pair(first, second):
+    """Пара строк без пробелов по краям или None, если чего-то не хватает"""
+    if not isinstance(first, str) or not isinstance(second, str):
+        return None
+    first, second = first.strip(), second.strip()
+    return (first, second) if first and second else None
+
+def read_csv(f):
+    """Пары из CSV: два первых столбца, разделитель определяется по началу файла"""
+    sample = f.read(64 * 1024)
+    f.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(f, dialect)
+    for number, row in enumerate(reader):
+        if number == 0 and tuple(cell.strip().lower() for cell in row[:2]) in HEADERS:
+            continue
+        yield _pair(row[0], row[1]) if len(row) >= 2 else None
+
+def read_jsonl(f):
+    """Пары из JSONL: объекты с полями text/label или question/answer"""
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        if not isinstance(record, dict):
+            yield None
+            continue
+        for first, second in FIELDS.values():
+            if first in record:
+                yield _pair(record.get(first), record.get(second))
+                break
+        else:
+            yield None
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+def write_header(f, fmt: str, kind: str):
+    """Заголовок выгрузки (только у CSV)"""
+    if fmt == 'csv':
+        csv.writer(f).writerow(FIELDS[kind])
+
+def write_rows(f, fmt: str, kind: str, rows):
+    """Дописывает пары корпуса в открытый файл CSV или JSONL"""
+    first, second = FIELDS[kind]
+    if fmt == 'csv':
+        csv.writer(f).writerows(rows)
+    else:
+        f.writelines(json.dumps({first: a, second: b}, ensure_ascii=False) + '\n' for a, b in rows)
+
+async def import_file(kind: str, path, fmt: str, on_progress=None) -> dict:
+    """Импортирует файл в корпус ``kind``: чтение частями, дедупликация, одна запись в хранилище.
+
+    Файл разбирается порциями по ``IMPORT_CHUNK_ROWS`` строк в отдельном
+    потоке; повторы внутри файла отсеиваются по множеству хешей сразу, а
+    повторы корпуса - при добавлении по его индексу точных совпадений. Все
+    новые примеры пишутся в хранилище одной групповой записью (одна
+    транзакция SQLite или одна дозапись журнала). ``on_progress`` -
+    необязательная корутина, получающая число прочитанных строк, не чаще
+    раза в ``IMPORT_PROGRESS_INTERVAL`` секунд.
+    """
+    # Ключ дедупликации тот же, что у корпуса: нормализованный текст / вопрос
+    normalize = str.lower if kind == 'training' else (lambda text: text.lower().strip())
+    report = {'read': 0, 'invalid': 0, 'added': 0, 'duplicates': 0}
+    seen, rows = set(), []
+    last_report = time.monotonic()
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = READERS[fmt](f)
+        while True:
+            chunk = await asyncio.to_thread(list, islice(reader, config.IMPORT_CHUNK_ROWS))
+            if not chunk:
+                break
+            report['read'] += len(chunk)
+            for pair in chunk:
+                if pair is None:
+                    report['invalid'] += 1
+                    continue
+                key = normalize(pair[0])
+                if key in seen:
+                    report['duplicates'] += 1
+                    continue
+                seen.add(key)
+                rows.append(pair)
+            if on_progress is not None and time.monotonic() - last_report >= config.IMPORT_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                try:
+                    await on_progress(report['read'])
+                except Exception as e:
+                    logger.error(f"Ошибка отправки прогресса импорта: {e}")
+
+    if kind == 'training':
+        report['added'] = await asyncio.to_thread(registry.ai_model.add_training_rows, rows)
+    else:
+        report['added'] = await asyncio.to_thread(registry.chat_model.add_examples, rows)
+    report['duplicates'] += len(rows) - report['added']
+    logger.info(
+        f"Импорт в корпус {kind}: прочитано {report['read']}, добавлено {report['added']}, "
+        f"повторов {report['duplicates']}, пропущено {report['invalid']}"
+    )
+    return report
+
+async def export_file(kind: str, path, fmt: str) -> int:
+    """Выгружает корпус ``kind`` в файл; возвращает число строк.
+
+    Корпус читается страницами по ``IMPORT_CHUNK_ROWS`` строк по ключу
+    (``search`` с ``after_id``), и каждая страница сразу дописывается в файл:
+    в памяти не бывает копии всего корпуса, а блокировка корпуса держится
+    только на время чтения одной страницы.
+    """
+    corpus = training_corpus if kind == 'training' else chat_corpus
+    count = last_id = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        await asyncio.to_thread(write_header, f, fmt, kind)
+        while True:
+            page, has_more = await asyncio.to_thread(corpus.search, after_id=last_id, limit=config.IMPORT_CHUNK_ROWS)
+            if page:
+                await asyncio.to_thread(write_rows, f, fmt, kind, [(first, second) for _, first, second in page])
+                count += len(page)
+                last_id = page[-1][0]
+            if not has_more:
+                return count
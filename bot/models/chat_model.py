@@ -1,20 +1,29 @@
 import json
+import time
 import logging
 from pathlib import Path
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
 import joblib
 from core.config import config
+from core.metrics import exact_matches, inference_latency
+from .corpus import chat_corpus
+from .messages import ERROR_RESPONSE
+from .retrieval import InvertedIndex, LSAIndex
+from .artifacts import artifact_exists, dump_vectorizer, load_artifact, restore_vectorizer, save_artifact
 
 logger = logging.getLogger(__name__)
 
 class ChatModel:
     def __init__(self):
         self.data_path = Path(config.CHAT_DATA_PATH)
-        self.model_path = Path(config.MODEL_PATH) / "chat_model.joblib"
+        self.model_path = Path(config.MODEL_PATH) / "chat_model"  # Каталог артефакта (см. models.artifacts)
+        self.legacy_model_path = Path(config.MODEL_PATH) / "chat_model.joblib"
         self.vectorizer = TfidfVectorizer()
-        self.nn_model = NearestNeighbors(n_neighbors=1)
-        self.examples = {}
+        self.index = None
+        # Стабильное соответствие id документа индекса -> вопрос/ответ, сохраняется вместе с моделью
+        self.questions = []
+        self.answers = []
+        self.corpus = chat_corpus
         self._init_data_file()
         self.load_data()
 
@@ -26,37 +35,83 @@ class ChatModel:
                 json.dump({}, f, ensure_ascii=False, indent=2)
             logger.info(f"Создан новый файл чата: {self.data_path}")
 
+    @property
+    def examples(self) -> dict:
+        """Примеры чата из общего корпуса в памяти"""
+        return self.corpus.load_examples()
+
     def load_data(self):
         """Загрузка данных чата"""
+        examples = self.corpus.load_examples()
         try:
-            with open(self.data_path, 'r', encoding='utf-8') as f:
-                self.examples = json.load(f)
-            
-            if self.model_path.exists():
-                model_data = joblib.load(self.model_path)
+            if artifact_exists(self.model_path):
+                meta, arrays = load_artifact(self.model_path)
+                self.vectorizer = restore_vectorizer(meta, arrays)
+                self.questions = meta['questions']
+                self.answers = meta['answers']
+                index_class = LSAIndex if meta['engine'] == 'lsa' else InvertedIndex
+                self.index = index_class.from_arrays(arrays, len(self.questions))
+                self._check_engine(meta['engine'])
+            elif self.legacy_model_path.exists():
+                model_data = joblib.load(self.legacy_model_path)
                 self.vectorizer = model_data['vectorizer']
-                self.nn_model = model_data['nn_model']
+                if 'index' in model_data:
+                    self.index = model_data['index']
+                    self.questions = model_data['questions']
+                    self.answers = model_data['answers']
+                    self._check_engine(model_data.get('engine', 'sparse'))
+                else:
+                    # Старый формат (NearestNeighbors) не хранил список вопросов - строим индекс заново
+                    logger.warning("Модель чата в старом формате, индекс перестроен по текущим данным")
+                    self._build_index(examples, fit=False)
         except Exception as e:
             logger.error(f"Ошибка загрузки чата: {e}")
-            self.examples = {}
+
+    def _check_engine(self, engine: str):
+        """Перестраивает индекс, если движок в конфиге сменили после сохранения модели"""
+        if engine != config.CHAT_ENGINE:
+            logger.info(f"Индекс чата перестроен под движок {config.CHAT_ENGINE}")
+            self._build_index(dict(zip(self.questions, self.answers)), fit=False)
+
+    def _build_index(self, examples: dict, fit: bool = True):
+        """Строит поисковый индекс по вопросам корпуса"""
+        pairs = [(question, answer) for question, answer in examples.items() if isinstance(answer, str)]
+        if not pairs:
+            raise ValueError("Нет данных для обучения")
+        self.questions = [question for question, _ in pairs]
+        self.answers = [answer for _, answer in pairs]
+        if fit:
+            X = self.vectorizer.fit_transform(self.questions)
+        else:
+            X = self.vectorizer.transform(self.questions)
+        # SVD нужно хотя бы два вопроса и два термина; крошечный корпус ищем точным индексом
+        if config.CHAT_ENGINE == 'lsa' and min(X.shape) >= 2:
+            self.index = LSAIndex(X, config.CHAT_LSA_DIM, config.CHAT_LSA_DTYPE)
+        else:
+            self.index = InvertedIndex(X)
+
+    @property
+    def min_similarity(self) -> float:
+        """Порог косинуса для текущего движка"""
+        if isinstance(self.index, LSAIndex):
+            return config.CHAT_LSA_MIN_SIMILARITY
+        return config.CHAT_MIN_SIMILARITY
 
     def save_model(self):
-        """Сохранение модели чата"""
-        model_data = {
-            'vectorizer': self.vectorizer,
-            'nn_model': self.nn_model
-        }
-        joblib.dump(model_data, self.model_path)
+        """Сохранение модели чата: словарь и тексты в метаданных, числовые массивы - файлами .npy"""
+        meta, arrays = dump_vectorizer(self.vectorizer)
+        meta.update({
+            'engine': 'lsa' if isinstance(self.index, LSAIndex) else 'sparse',
+            'questions': self.questions,
+            'answers': self.answers
+        })
+        arrays.update(self.index.to_arrays())
+        save_artifact(self.model_path, meta, arrays)
 
     def train(self):
         """Обучение модели чата"""
         try:
-            if not self.examples:
-                raise ValueError("Нет данных для обучения")
-                
-            questions = list(self.examples.keys())
-            X = self.vectorizer.fit_transform(questions)
-            self.nn_model.fit(X)
+            self._build_index(dict(self.examples))
             self.save_model()
             return True
         except Exception as e:
@@ -69,30 +124,60 @@ class ChatModel:
         if not question or not answer:
             return False
             
-        if question not in self.examples:
-            self.examples[question] = answer
-            with open(self.data_path, 'w', encoding='utf-8') as f:
-                json.dump(self.examples, f, ensure_ascii=False, indent=2)
-            return True
-        return False
+        return self.corpus.add(question, answer)
+
+    def add_examples(self, rows) -> int:
+        """Массово добавляет пары (вопрос, ответ); возвращает число новых примеров"""
+        normalized = ((question.lower().strip(), answer) for question, answer in rows)
+        return self.corpus.add_many((question, answer) for question, answer in normalized if question and answer)
 
     def get_response(self, query: str) -> str:
         """Получение ответа на сообщение"""
+        return self.get_responses([query])[0]
+
+    def search(self, query: str, k: int = 5) -> list:
+        """Top-k похожих вопросов: список (вопрос, ответ, косинус)"""
+        if self.index is None:
+            return []
+        X_query = self.vectorizer.transform([query.lower().strip()])
+        ids, scores = self.index.search(X_query.tocsr()[0], k)
+        return [(self.questions[i], self.answers[i], float(score)) for i, score in zip(ids, scores)]
+
+    def get_responses(self, queries: list) -> list:
+        """Получение ответов на пачку сообщений одним поиском соседей"""
+        default = "Я вас не понял. Можете переформулировать?"
+        results = [default] * len(queries)
+        misses = list(range(len(queries)))
         try:
-            query = query.lower().strip()
+            queries = [query.lower().strip() for query in queries]
+            examples = self.examples
             
             # Точное совпадение
-            if query in self.examples:
-                return self.examples[query]
+            misses = []
+            for i, query in enumerate(queries):
+                if query in examples:
+                    results[i] = examples[query]
+                else:
+                    misses.append(i)
+            exact_matches.inc(len(queries) - len(misses), model='chat', result='hit')
+            exact_matches.inc(len(misses), model='chat', result='miss')
             
             # Поиск похожих вопросов
-            if self.model_path.exists():
-                X_query = self.vectorizer.transform([query])
-                distances, indices = self.nn_model.kneighbors(X_query)
-                if distances[0][0] < 0.8:  # Порог схожести
-                    closest_q = list(self.examples.keys())[indices[0][0]]
-                    return self.examples[closest_q]
+            if misses and self.index is not None:
+                started = time.perf_counter()
+                X_query = self.vectorizer.transform([queries[i] for i in misses])
+                vectorized = time.perf_counter()
+                found = self.index.search_batch(X_query, k=1)
+                inference_latency.observe(vectorized - started, model='chat', phase='vectorize')
+                inference_latency.observe(time.perf_counter() - vectorized, model='chat', phase='search')
+                threshold = self.min_similarity
+                for i, (ids, scores) in zip(misses, found):
+                    if len(ids) and scores[0] >= threshold:  # Порог схожести
+                        results[i] = self.answers[ids[0]]
         except Exception as e:
             logger.error(f"Ошибка поиска ответа: {e}")
+            # Сбой поиска - не "не понял": такой ответ не должен попасть в кэш
+            for i in misses:
+                results[i] = ERROR_RESPONSE
         
-        return "Я вас не понял. Можете переформулировать?"
\ No newline at end of file
+        return results
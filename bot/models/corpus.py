@@ -0,0 +1,287 @@
+import logging
+import threading
+from itertools import islice
+from core.config import config
+from core.metrics import corpus_size
+from .journal import CorpusJournal
+from .sqlite_store import SQLiteCorpusStore
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк массового добавления обрабатывается за одно взятие блокировки корпуса
+ADD_MANY_CHUNK = 2000
+
+def create_store(kind: str, snapshot_path, journal_path, empty_snapshot):
+    """Создает хранилище корпуса согласно ``config.CORPUS_BACKEND``"""
+    if config.CORPUS_BACKEND == 'sqlite':
+        return SQLiteCorpusStore(
+            config.CORPUS_DB_PATH, kind, snapshot_path, journal_path,
+            flush_interval=config.JOURNAL_FLUSH_INTERVAL,
+        )
+    return CorpusJournal(
+        snapshot_path, journal_path, empty_snapshot,
+        flush_interval=config.JOURNAL_FLUSH_INTERVAL,
+        compact_threshold=config.JOURNAL_COMPACT_THRESHOLD,
+    )
+
+def _chunks(rows):
+    """Порции по ``ADD_MANY_CHUNK`` строк"""
+    rows = iter(rows)
+    while chunk := list(islice(rows, ADD_MANY_CHUNK)):
+        yield chunk
+
+def _page(rows, substring, label, after_id, before_id, limit):
+    """Постраничная выборка из строк (id, текст, метка), упорядоченных по id"""
+    if before_id is not None:
+        rows = (row for row in reversed(rows) if row[0] < before_id)
+    else:
+        rows = (row for row in rows if row[0] > after_id)
+    page = []
+    for row in rows:
+        if substring and substring not in row[1].lower():
+            continue
+        if label and row[2] != label:
+            continue
+        page.append(row)
+        if len(page) > limit:
+            break
+    has_more = len(page) > limit
+    page = page[:limit]
+    if before_id is not None:
+        page.reverse()
+    return page, has_more
+
+class TrainingCorpus:
+    """Корпус вопрос-ответ в памяти с хеш-индексом точных совпадений.
+
+    Один экземпляр на процесс: его разделяют все версии ``AIModel``, поэтому
+    подмена модели в реестре не теряет добавленные примеры.
+    """
+
+    def __init__(self, snapshot_path, journal_path):
+        self.store = create_store('training', snapshot_path, journal_path, {"texts": [], "labels": []})
+        self._lock = threading.RLock()
+        self.original_texts = []  # Оригинальные тексты (пишутся в снапшот)
+        self.lower_texts = []
+        self.labels = []
+        self.text_index = {}  # Нормализованный текст -> метка (точное совпадение за O(1))
+        self.version = 0  # Растет при каждом изменении корпуса (для кэша ответов)
+        self._loaded = False
+        self.store.attach(self._lock, self._snapshot, self._apply_records)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Нормализует текст для поиска точного совпадения"""
+        return text.lower()
+
+    def _set_corpus(self, texts, labels):
+        """Заменяет корпус в памяти и перестраивает индекс"""
+        self.original_texts = list(texts)
+        self.lower_texts = [self.normalize(text) for text in self.original_texts]
+        self.labels = list(labels)
+        self.text_index = {}
+        for text_lower, label in zip(self.lower_texts, self.labels):
+            # Как и при линейном поиске, побеждает первое вхождение
+            self.text_index.setdefault(text_lower, label)
+        self.version += 1
+
+    def _append(self, text: str, label: str) -> bool:
+        text_lower = self.normalize(text)
+        if text_lower in self.text_index:
+            return False
+        self.original_texts.append(text)
+        self.lower_texts.append(text_lower)
+        self.labels.append(label)
+        self.text_index[text_lower] = label
+        self.version += 1
+        return True
+
+    def _apply_records(self, records):
+        """Применяет записи журнала (повторное применение безопасно)"""
+        for record in records:
+            self._append(record['text'], record['label'])
+
+    def _snapshot(self):
+        return {"texts": list(self.original_texts), "labels": list(self.labels)}
+
+    def load_data(self, wait: bool = False):
+        """Возвращает корпус из памяти, дочитывая только новые записи хранилища (``wait`` - см. ``poll``)"""
+        with self._lock:
+            records = self.store.poll(wait) if self._loaded else None
+            if records is None:
+                try:
+                    snapshot, records = self.store.load()
+                    if not isinstance(snapshot, dict) or 'texts' not in snapshot or 'labels' not in snapshot:
+                        raise ValueError("Invalid data format")
+                    self._set_corpus(snapshot['texts'], snapshot['labels'])
+                except Exception as e:
+                    logger.error(f"Ошибка загрузки данных: {e}")
+                    self._set_corpus([], [])
+                    records = []
+                # Запоминаем состояние даже для битого файла, чтобы не перечитывать его на каждом запросе
+                self._loaded = True
+            self._apply_records(records)
+            return {"texts": self.lower_texts, "labels": self.labels}
+
+    def copy_data(self):
+        """Согласованная копия корпуса для обучения"""
+        with self._lock:
+            self.load_data()
+            return {"texts": list(self.lower_texts), "labels": list(self.labels)}
+
+    def rows_since(self, start: int):
+        """Примеры корпуса, начиная с позиции ``start`` (None, если корпус короче)"""
+        with self._lock:
+            self.load_data()
+            if start > len(self.lower_texts):
+                return None
+            return {"texts": self.lower_texts[start:], "labels": self.labels[start:]}
+
+    def lookup(self, text_lower: str):
+        """Метка для точного совпадения нормализованного текста или None"""
+        return self.text_index.get(text_lower)
+
+    def add(self, text: str, label: str) -> bool:
+        """Добавляет пример: O(1) в памяти плюс групповая запись в хранилище"""
+        with self._lock:
+            self.load_data()
+            if not self._append(text, label):
+                return False
+            self.store.append({"text": text, "label": label})
+            return True
+
+    def add_many(self, rows) -> int:
+        """Добавляет пары (текст, метка) без дубликатов групповой записью в хранилище; возвращает число новых.
+
+        Блокировка корпуса берется на порции по ``ADD_MANY_CHUNK`` строк и
+        только на добавление в память и постановку записей в буфер
+        хранилища; сама запись идет уже без блокировки, чтобы чтения и
+        добавления корпуса не ждали ее.
+        """
+        added = 0
+        for chunk in _chunks(rows):
+            with self._lock:
+                self.load_data()
+                records = [{"text": text, "label": label} for text, label in chunk if self._append(text, label)]
+                if records:
+                    self.store.append_many(records)
+            added += len(records)
+        if added:
+            self.store.commit()
+        return added
+
+    def search(self, substring: str = None, label: str = None,
+               after_id: int = 0, before_id: int = None, limit: int = 10):
+        """Страница примеров (id, текст, метка) и признак продолжения"""
+        if isinstance(self.store, SQLiteCorpusStore):
+            return self.store.search(substring, label, after_id, before_id, limit)
+        with self._lock:
+            self.load_data()
+            if not substring and not label and before_id is None:
+                # Без фильтров id - это позиция в корпусе: страница берется срезом (выгрузка)
+                end = after_id + limit + 1
+                rows = list(zip(range(after_id + 1, end + 1), self.original_texts[after_id:end], self.labels[after_id:end]))
+                return rows[:limit], len(rows) > limit
+            rows = [(i + 1, text, label_) for i, (text, label_) in enumerate(zip(self.original_texts, self.labels))]
+        return _page(rows, substring and substring.lower(), label, after_id, before_id, limit)
+
+    def flush(self):
+        """Синхронно сбрасывает буфер хранилища на диск"""
+        self.store.flush()
+
+class ChatCorpus:
+    """Корпус чата (вопрос -> ответ) в памяти, общий для всех версий ``ChatModel``"""
+
+    def __init__(self, snapshot_path, journal_path):
+        self.store = create_store('chat', snapshot_path, journal_path, {})
+        self._lock = threading.RLock()
+        self.examples = {}
+        self.version = 0  # Растет при каждом изменении корпуса (для кэша ответов)
+        self._loaded = False
+        self.store.attach(self._lock, self._snapshot, self._apply_records)
+
+    def _apply_records(self, records):
+        for record in records:
+            if record['question'] not in self.examples:
+                self.examples[record['question']] = record['answer']
+                self.version += 1
+
+    def _snapshot(self):
+        return dict(self.examples)
+
+    def load_examples(self) -> dict:
+        """Возвращает словарь примеров, дочитывая только новые записи хранилища"""
+        with self._lock:
+            records = self.store.poll() if self._loaded else None
+            if records is None:
+                try:
+                    snapshot, records = self.store.load()
+                    if not isinstance(snapshot, dict):
+                        raise ValueError("Invalid data format")
+                    self.examples = snapshot
+                except Exception as e:
+                    logger.error(f"Ошибка загрузки чата: {e}")
+                    self.examples = {}
+                    records = []
+                self.version += 1
+                self._loaded = True
+            self._apply_records(records)
+            return self.examples
+
+    def add(self, question: str, answer: str) -> bool:
+        """Добавляет пример: O(1) в памяти плюс групповая запись в хранилище"""
+        with self._lock:
+            self.load_examples()
+            if question in self.examples:
+                return False
+            self.examples[question] = answer
+            self.version += 1
+            self.store.append({"question": question, "answer": answer})
+            return True
+
+    def add_many(self, rows) -> int:
+        """Добавляет пары (вопрос, ответ) без дубликатов групповой записью в хранилище; возвращает число новых.
+
+        Как и у ``TrainingCorpus.add_many``, запись в хранилище идет без блокировки корпуса.
+        """
+        added = 0
+        for chunk in _chunks(rows):
+            with self._lock:
+                examples = self.load_examples()
+                records = []
+                for question, answer in chunk:
+                    if question not in examples:
+                        examples[question] = answer
+                        records.append({"question": question, "answer": answer})
+                if records:
+                    self.version += 1
+                    self.store.append_many(records)
+            added += len(records)
+        if added:
+            self.store.commit()
+        return added
+
+    def search(self, substring: str = None, label: str = None,
+               after_id: int = 0, before_id: int = None, limit: int = 10):
+        """Страница примеров (id, вопрос, ответ) и признак продолжения"""
+        if isinstance(self.store, SQLiteCorpusStore):
+            return self.store.search(substring, label, after_id, before_id, limit)
+        with self._lock:
+            examples = self.load_examples()
+            if not substring and not label and before_id is None:
+                items = islice(examples.items(), after_id, after_id + limit + 1)
+                rows = [(i, question, answer) for i, (question, answer) in enumerate(items, after_id + 1)]
+                return rows[:limit], len(rows) > limit
+            rows = [(i + 1, question, answer) for i, (question, answer) in enumerate(examples.items())]
+        return _page(rows, substring and substring.lower(), label, after_id, before_id, limit)
+
+    def flush(self):
+        """Синхронно сбрасывает буфер хранилища на диск"""
+        self.store.flush()
+
+training_corpus = TrainingCorpus(config.TRAINING_DATA_PATH, config.TRAINING_JOURNAL_PATH)
+chat_corpus = ChatCorpus(config.CHAT_DATA_PATH, config.CHAT_JOURNAL_PATH)
+
+# Размер корпусов в памяти считается в момент опроса метрик
+corpus_size.set_function(lambda: len(training_corpus.labels), corpus='training')
+corpus_size.set_function(lambda: len(chat_corpus.examples), corpus='chat')
\ No newline at end of file
@@ -0,0 +1,164 @@
+import numpy as np
+
+class FlatForest:
+    """Случайный лес, разложенный в плоские массивы узлов всех деревьев.
+
+    Массивы признаков, порогов, потомков и вероятностей листьев хранятся
+    подряд для всех деревьев и могут быть отображены в память из артефакта
+    (см. ``models.artifacts``) - разные процессы бота делят их через page
+    cache. Предсказания совпадают с ``RandomForestClassifier.predict``.
+    Признаки перенумерованы: лес смотрит только на столбцы из ``columns``.
+    Цепочки узлов по умолчанию для обхода (``_compile_chains``) строятся
+    при создании объекта и в артефакт не пишутся.
+    """
+
+    ARRAYS = ('roots', 'feature', 'threshold', 'left', 'right', 'value', 'classes', 'columns')
+
+    def __init__(self, roots, feature, threshold, left, right, value, classes, columns, n_features: int):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.classes = classes
+        self.columns = columns
+        self.n_features = n_features
+        # Номер признака словаря -> номер столбца леса (-1, если лес его не использует)
+        self.column_map = np.full(n_features, -1, dtype=np.int32)
+        self.column_map[columns] = np.arange(len(columns), dtype=np.int32)
+        self._compile_chains()
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Компилирует обученный ``RandomForestClassifier``"""
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        features = np.concatenate([tree.feature for tree in trees])
+        columns = np.unique(features[features >= 0]).astype(np.int32)
+
+        roots, feature, threshold, left, right, value = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            roots.append(offset)
+            inner = tree.children_left >= 0
+            feature.append(np.where(inner, np.searchsorted(columns, tree.feature), -1))
+            threshold.append(tree.threshold)
+            left.append(np.where(inner, tree.children_left + offset, -1))
+            right.append(np.where(inner, tree.children_right + offset, -1))
+            # Как в DecisionTreeClassifier.predict_proba: доли классов в листе
+            proba = tree.value[:, 0, :].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(proba / normalizer)
+            offset += tree.node_count
+
+        return cls(
+            roots=np.array(roots, dtype=np.int64),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            left=np.concatenate(left).astype(np.int64),
+            right=np.concatenate(right).astype(np.int64),
+            value=np.concatenate(value),
+            classes=np.asarray(forest.classes_),
+            columns=columns,
+            n_features=forest.n_features_in_,
+        )
+
+    def to_arrays(self) -> dict:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, n_features: int):
+        return cls(**{name: arrays[name] for name in cls.ARRAYS}, n_features=n_features)
+
+    def _compile_chains(self):
+        """Раскладывает деревья на цепочки узлов по умолчанию.
+
+        Направление узла по умолчанию - куда идет пример, у которого признака
+        нет (значение 0): влево, если ``0 <= threshold``. Цепочка начинается
+        в корне или в потомке не по умолчанию и идет по умолчанию до листа.
+        Узлы каждой цепочки получают подряд идущие номера ``chain_pos``, так
+        что пример без признаков узлов цепочки проходит ее целиком за один шаг.
+        """
+        n_nodes = len(self.feature)
+        inner = self.feature >= 0
+        default = np.where(self.threshold >= 0, self.left, self.right)
+        # up - предыдущий узел цепочки (у начала цепочки - сам узел)
+        up = np.arange(n_nodes, dtype=np.int64)
+        up[default[inner]] = np.flatnonzero(inner)
+        depth = (up != np.arange(n_nodes)).astype(np.int64)
+        # Удвоение указателей: начало цепочки каждого узла и его номер в цепочке за log(длины) шагов
+        while True:
+            jump = up[up]
+            if np.array_equal(jump, up):
+                break
+            depth = depth + depth[up]
+            up = jump
+        head = up
+        order = np.lexsort((depth, head))
+        self.chain_pos = np.empty(n_nodes, dtype=np.int32)
+        self.chain_pos[order] = np.arange(n_nodes, dtype=np.int32)
+        length = np.bincount(head, minlength=n_nodes)
+        self.chain_end = (self.chain_pos[head] + length[head] - 1).astype(np.int32)
+        self.chain_node = order.astype(np.int32)
+        # Узлы, сгруппированные по столбцу признака: кандидаты в "остановки" для признаков запроса
+        column = np.where(inner, self.feature, len(self.columns))
+        self.by_column = np.argsort(column, kind='stable').astype(np.int32)
+        self.column_start = np.searchsorted(column[self.by_column], np.arange(len(self.columns) + 1))
+
+    def _stops(self, X):
+        """Узлы, где путь примера зависит от его признаков: ключи (пример, chain_pos), узлы, значения"""
+        X = X.tocsr()
+        n_positions = len(self.feature)
+        rows = np.repeat(np.arange(X.shape[0], dtype=np.int64), np.diff(X.indptr))
+        cols = self.column_map[X.indices]
+        used = cols >= 0
+        rows, cols, values = rows[used], cols[used], X.data[used].astype(np.float32)
+        counts = self.column_start[cols + 1] - self.column_start[cols]
+        total = int(counts.sum())
+        # Разворачиваем диапазоны узлов каждого признака без цикла Python
+        offsets = np.repeat(self.column_start[cols] - np.cumsum(counts) + counts, counts) + np.arange(total)
+        nodes = self.by_column[offsets]
+        keys = np.repeat(rows, counts) * n_positions + self.chain_pos[nodes]
+        order = np.argsort(keys, kind='stable')
+        return keys[order], nodes[order], np.repeat(values, counts)[order]
+
+    def apply(self, X):
+        """Номера листьев (n_samples, n_trees): все деревья обходятся одновременно.
+
+        Пример проходит цепочку по умолчанию до первого узла, признак которого
+        у него есть (бинарный поиск по отсортированным остановкам), и только
+        там сравнивает значение с порогом. Поэтому число шагов NumPy - это
+        число таких узлов на самом длинном пути, а не глубина дерева.
+        """
+        keys, nodes, values = self._stops(X)
+        n_samples, n_trees = X.shape[0], len(self.roots)
+        n_positions = len(self.feature)
+        node = np.tile(self.roots, n_samples)
+        base = np.repeat(np.arange(n_samples, dtype=np.int64) * n_positions, n_trees)
+        active = np.arange(len(node))
+        while len(active):
+            current = node[active]
+            offset = base[active]
+            found = np.searchsorted(keys, offset + self.chain_pos[current])
+            found_key = keys[np.minimum(found, len(keys) - 1)] if len(keys) else np.full(len(found), -1)
+            stop = (found < len(keys)) & (found_key <= offset + self.chain_end[current])
+            # Остановок до конца цепочки нет - пример доходит до листа в ее конце
+            finished = ~stop
+            node[active[finished]] = self.chain_node[self.chain_end[current[finished]]]
+            stop_index = found[stop]
+            stop_node = nodes[stop_index]
+            go_left = values[stop_index] <= self.threshold[stop_node]
+            node[active[stop]] = np.where(go_left, self.left[stop_node], self.right[stop_node])
+            active = active[stop]
+        return node.reshape(n_samples, n_trees)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # Суммируем по деревьям в том же порядке, что и sklearn, - результат совпадает побитно
+        proba = self.value[leaves].sum(axis=1)
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
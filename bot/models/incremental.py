@@ -0,0 +1,83 @@
+import math
+import threading
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+def make_hashing_vectorizer(n_features: int) -> HashingVectorizer:
+    """Векторизатор без словаря: новые слова не требуют переобучения"""
+    return HashingVectorizer(n_features=n_features, lowercase=True, alternate_sign=False, norm='l2')
+
+class OnlineCentroidClassifier:
+    """Линейный классификатор по ближайшему центроиду с ``partial_fit``.
+
+    ``SGDClassifier.partial_fit`` требует знать все классы заранее, а метки у
+    нас - произвольные ответы, которые админ вводит на ходу. Здесь каждый
+    класс хранится как сумма векторов его примеров в виде инвертированного
+    индекса "признак -> {класс: вес}", а предсказание - косинус запроса с
+    центроидами. Добавление примера стоит O(число ненулевых признаков),
+    новый класс появляется без перестройки модели.
+    """
+
+    def __init__(self):
+        self.classes_ = []
+        self._class_rows = {}
+        self._postings = {}
+        self._norms_sq = []
+        self._counts = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def partial_fit(self, X, y):
+        """Добавляет примеры к центроидам их классов"""
+        X = X.tocsr()
+        with self._lock:
+            for i, cls in enumerate(y):
+                row = self._class_rows.get(cls)
+                if row is None:
+                    row = len(self.classes_)
+                    self._class_rows[cls] = row
+                    self.classes_.append(cls)
+                    self._norms_sq.append(0.0)
+                    self._counts.append(0)
+
+                start, end = X.indptr[i], X.indptr[i + 1]
+                dot = sq = 0.0
+                for feature, value in zip(X.indices[start:end].tolist(), X.data[start:end].tolist()):
+                    weights = self._postings.setdefault(feature, {})
+                    old = weights.get(row, 0.0)
+                    dot += old * value
+                    sq += value * value
+                    weights[row] = old + value
+                # ||s + x||^2 = ||s||^2 + 2 s.x + ||x||^2
+                self._norms_sq[row] += 2 * dot + sq
+                self._counts[row] += 1
+        return self
+
+    def predict(self, X):
+        """Класс с максимальным косинусом к центроиду (при отсутствии общих признаков - самый частый)"""
+        X = X.tocsr()
+        with self._lock:
+            if not self.classes_:
+                raise ValueError("Модель не обучена")
+            fallback = self.classes_[int(np.argmax(self._counts))]
+            predictions = []
+            for i in range(X.shape[0]):
+                start, end = X.indptr[i], X.indptr[i + 1]
+                scores = {}
+                for feature, value in zip(X.indices[start:end].tolist(), X.data[start:end].tolist()):
+                    for row, weight in self._postings.get(feature, {}).items():
+                        scores[row] = scores.get(row, 0.0) + value * weight
+                if not scores:
+                    predictions.append(fallback)
+                    continue
+                best = max(scores, key=lambda row: scores[row] / math.sqrt(self._norms_sq[row]))
+                predictions.append(self.classes_[best])
+        return np.array(predictions)
@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессной блокировки журнала нет
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def _file_lock(path):
+    """Межпроцессная блокировка на файле ``path`` (flock, снимается при закрытии)"""
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield
+
+def _signature(path):
+    """Сигнатура файла (mtime, размер) или None, если файла нет"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class BufferedStore:
+    """Основа хранилищ корпуса с групповой записью.
+
+    ``append`` только кладет запись в буфер; фоновый поток раз в
+    ``flush_interval`` секунд забирает все накопившиеся записи и передает их
+    в ``_write`` одной пачкой. Наследники реализуют ``_write``, ``load`` и ``poll``.
+    """
+
+    def __init__(self, name: str, flush_interval: float):
+        self.name = name
+        self.flush_interval = flush_interval
+        self._io_lock = threading.RLock()
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._writer = None
+        self._closed = False
+        self._owner_lock = None
+        self._snapshot_fn = None
+        self._apply_fn = None
+        atexit.register(self.close)
+
+    def attach(self, lock, snapshot_fn, apply_fn):
+        """Подключает владельца корпуса (нужен для компактизации)"""
+        self._owner_lock = lock
+        self._snapshot_fn = snapshot_fn
+        self._apply_fn = apply_fn
+
+    def append(self, record):
+        """Ставит запись в очередь на групповую запись"""
+        with self._cond:
+            self._buffer.append(record)
+            self._wake_writer()
+
+    def append_many(self, records):
+        """Ставит пачку записей в очередь одной операцией (массовый импорт); записать сразу - ``commit``"""
+        with self._cond:
+            self._buffer.extend(records)
+
+    def commit(self):
+        """Синхронно пишет буфер одной групповой записью; вызывается без блокировки владельца"""
+        self.flush()
+        with self._cond:
+            # Запись не удалась - пачка осталась в буфере, ее повторит фоновый поток
+            if self._buffer:
+                self._wake_writer()
+                return
+        self._after_flush()
+
+    def _wake_writer(self):
+        """Запускает фоновый поток записи и будит его (вызывается под ``_cond``)"""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name=f"store-{self.name}", daemon=True)
+            self._writer.start()
+        self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._buffer:
+                    return
+            # Даем соседним добавлениям попасть в ту же групповую запись
+            time.sleep(self.flush_interval)
+            self.flush()
+            self._after_flush()
+
+    def _write(self, batch):
+        raise NotImplementedError
+
+    def _after_flush(self):
+        """Вызывается фоновым потоком после каждой групповой записи"""
+
+    def flush(self):
+        """Синхронно записывает буфер"""
+        with self._io_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Ошибка записи хранилища {self.name}: {e}")
+                with self._cond:
+                    self._buffer[:0] = batch
+
+    def compact(self):
+        """Сворачивает накопленные записи (если хранилище это поддерживает)"""
+
+    def close(self):
+        """Дописывает буфер и останавливает фоновый поток"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+
+class CorpusJournal(BufferedStore):
+    """Хранилище корпуса: JSON-снапшот плюс append-only журнал в формате JSONL.
+
+    Новые записи копятся в буфере и пишутся фоновым потоком одной групповой
+    записью с одним fsync. Когда в журнале набирается ``compact_threshold``
+    записей, он сворачивается в новый снапшот (запись во временный файл и
+    атомарная замена), а сам журнал обнуляется. При старте снапшот читается
+    целиком, а журнал воспроизводится поверх него.
+
+    Владелец корпуса подключается через ``attach``: он отдает свою блокировку,
+    функцию снятия снапшота и функцию применения записей. Порядок блокировок
+    везде один: блокировка владельца -> ``_io_lock`` -> ``_cond``.
+    """
+
+    def __init__(self, snapshot_path, journal_path, empty_snapshot,
+                 flush_interval: float = 0.2, compact_threshold: int = 1000):
+        super().__init__(Path(journal_path).stem, flush_interval)
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(journal_path)
+        self.empty_snapshot = empty_snapshot
+        self.compact_threshold = compact_threshold
+        self.journal_records = 0
+        self._offset = 0  # Сколько байт журнала уже прочитано
+        # Общая для процессов блокировка: дозапись журнала и его обнуление при компактизации
+        self.lock_path = self.journal_path.with_name(self.journal_path.name + '.lock')
+        self._snapshot_signature = None
+
+    def _read_snapshot(self):
+        if not self.snapshot_path.exists():
+            return json.loads(json.dumps(self.empty_snapshot))
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _read_journal(self, offset: int):
+        """Читает целые строки журнала, начиная с ``offset``"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        # Недописанный хвост (без перевода строки) оставляем на следующее чтение
+        end = chunk.rfind(b'\n') + 1
+        records = []
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Пропущена поврежденная запись журнала {self.journal_path}")
+        return records, offset + end
+
+    def load(self):
+        """Читает снапшот и все записи журнала"""
+        with self._io_lock:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            snapshot = self._read_snapshot()
+            records, self._offset = self._read_journal(0)
+            # Обрезаем хвост, оборванный аварийным завершением, чтобы новые записи не склеились с ним
+            if self.journal_path.exists() and self.journal_path.stat().st_size > self._offset:
+                logger.warning(f"Обрезан недописанный хвост журнала {self.journal_path}")
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(self._offset)
+            self.journal_records = len(records)
+            self._snapshot_signature = _signature(self.snapshot_path)
+            return snapshot, records
+
+    def poll(self, wait: bool = False):
+        """Возвращает записи, появившиеся в журнале после прошлого чтения.
+
+        ``None`` означает, что снапшот заменили или журнал обрезали снаружи и
+        корпус нужно перечитать целиком. Без ``wait`` не ждет, пока этот
+        процесс пишет (импорт, компактизация): чужие записи дочитаются в
+        следующий раз.
+        """
+        if not self._io_lock.acquire(blocking=wait):
+            return []
+        try:
+            if _signature(self.snapshot_path) != self._snapshot_signature:
+                return None
+            journal = _signature(self.journal_path)
+            size = journal[1] if journal else 0
+            if size < self._offset:
+                return None
+            if size == self._offset:
+                return []
+            records, self._offset = self._read_journal(self._offset)
+            return records
+        finally:
+            self._io_lock.release()
+
+    def _write(self, batch):
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in batch)
+        with _file_lock(self.lock_path), open(self.journal_path, 'ab') as f:
+            start = f.tell()
+            f.write(data.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+            # Свои записи уже применены в памяти, перечитывать их не нужно
+            if self._offset == start:
+                self._offset = f.tell()
+        self.journal_records += len(batch)
+
+    def _after_flush(self):
+        if self.journal_records >= self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        """Сворачивает журнал в новый снапшот.
+
+        Под блокировками снимается только копия корпуса и позиция журнала;
+        сериализация и fsync идут без них, чтобы добавления и чтения корпуса
+        не ждали записи всего снапшота. Замена файла и обнуление журнала -
+        снова под блокировками (включая межпроцессную блокировку журнала) и
+        только если в журнал за это время ничего не дописали (иначе попытка
+        повторится после следующей записи).
+        """
+        if self._snapshot_fn is None:
+            return
+        with self._owner_lock, self._io_lock:
+            self.flush()
+            try:
+                # Подхватываем записи, дописанные в журнал другими процессами
+                tail, self._offset = self._read_journal(self._offset)
+                if tail:
+                    self._apply_fn(tail)
+                snapshot = self._snapshot_fn()
+            except Exception as e:
+                logger.error(f"Ошибка компактизации журнала {self.journal_path}: {e}")
+                return
+            offset = self._offset
+            snapshot_signature = self._snapshot_signature
+
+        tmp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            logger.error(f"Ошибка компактизации журнала {self.journal_path}: {e}")
+            return
+
+        # Блокировка журнала не дает другим процессам дописать его между проверкой и обнулением
+        with self._owner_lock, self._io_lock, _file_lock(self.lock_path):
+            journal = _signature(self.journal_path)
+            if (journal[1] if journal else 0) != offset or _signature(self.snapshot_path) != snapshot_signature:
+                # Журнал дописали (или снапшот заменил другой процесс) - снапшот уже неполный
+                tmp_path.unlink(missing_ok=True)
+                logger.info(f"Компактизация журнала {self.journal_path} отложена: появились новые записи")
+                return
+            try:
+                os.replace(tmp_path, self.snapshot_path)
+                with open(self.journal_path, 'wb'):
+                    pass
+            except Exception as e:
+                logger.error(f"Ошибка компактизации журнала {self.journal_path}: {e}")
+                return
+
+            logger.info(f"Журнал {self.journal_path} свернут в снапшот ({self.journal_records} записей)")
+            self._offset = 0
+            self.journal_records = 0
+            self._snapshot_signature = _signature(self.snapshot_path)
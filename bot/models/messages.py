@@ -0,0 +1,3 @@
+# Ответы моделей, которые нужны без загрузки самих моделей (и без импорта sklearn)
+ERROR_RESPONSE = "Произошла ошибка при обработке запроса."
+WARMING_UP_RESPONSE = "⏳ Модели загружаются после перезапуска, попробуйте через несколько секунд."
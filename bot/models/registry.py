@@ -0,0 +1,131 @@
+import time
+import threading
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .ai_model import AIModel
+    from .chat_model import ChatModel
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """Единственный владелец загруженных моделей процесса.
+
+    Обработчики берут ссылку на текущую модель через свойства ``ai_model`` и
+    ``chat_model`` и не сохраняют её между сообщениями. Переобученная модель
+    собирается в отдельном объекте и подменяется одной операцией присваивания,
+    поэтому уже начатые предсказания спокойно доходят на старой версии.
+
+    Модули моделей (и sklearn) импортируются при первом обращении, обычно в
+    ``warm_up`` в фоне после старта; до его окончания ``ready`` не выставлен.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ai_model = None
+        self._chat_model = None
+        self.versions = {'ai': 0, 'chat': 0}
+        self.ready = threading.Event()
+        self.on_examples_added = []  # Функции (kind), вызываемые после дообучения модели новыми примерами
+
+    @property
+    def ai_model(self) -> 'AIModel':
+        """Текущая модель вопрос-ответ (создается при первом обращении)"""
+        model = self._ai_model
+        if model is None:
+            with self._lock:
+                if self._ai_model is None:
+                    from .ai_model import AIModel
+                    self._ai_model = AIModel()
+                    self._ai_model.load_model()
+                model = self._ai_model
+        return model
+
+    @property
+    def chat_model(self) -> 'ChatModel':
+        """Текущая модель чата (создается при первом обращении)"""
+        model = self._chat_model
+        if model is None:
+            with self._lock:
+                if self._chat_model is None:
+                    from .chat_model import ChatModel
+                    self._chat_model = ChatModel()
+                model = self._chat_model
+        return model
+
+    def swap_ai_model(self, model: 'AIModel'):
+        """Атомарно подменяет модель вопрос-ответ"""
+        with self._lock:
+            self._ai_model = model
+            self.versions['ai'] += 1
+        logger.info(f"Модель вопрос-ответ обновлена до версии {self.versions['ai']}")
+
+    def swap_chat_model(self, model: 'ChatModel'):
+        """Атомарно подменяет модель чата"""
+        with self._lock:
+            self._chat_model = model
+            self.versions['chat'] += 1
+        logger.info(f"Модель чата обновлена до версии {self.versions['chat']}")
+
+    def reload_ai_model(self) -> bool:
+        """Загружает сохраненную модель вопрос-ответ с диска и подменяет текущую"""
+        from .ai_model import AIModel
+        model = AIModel()
+        if not model.load_model():
+            return False
+        self.swap_ai_model(model)
+        return True
+
+    def reload_chat_model(self) -> bool:
+        """Загружает сохраненную модель чата с диска и подменяет текущую"""
+        from .chat_model import ChatModel
+        model = ChatModel()
+        if model.index is None:
+            return False
+        self.swap_chat_model(model)
+        return True
+
+    def examples_added(self, kind: str):
+        """Сообщает подписчикам (supervisor.py), что модель дообучена новыми примерами корпуса"""
+        for listener in self.on_examples_added:
+            listener(kind)
+
+    def catch_up_ai_model(self) -> bool:
+        """Дообучает инкрементальную модель примерами, которые добавили другие процессы"""
+        model = self.ai_model
+        if model.mode != 'incremental':
+            return True
+        return model.catch_up()
+
+    def retrain_ai_model(self) -> bool:
+        """Обучает новую модель вопрос-ответ и подменяет ею текущую"""
+        from .ai_model import AIModel
+        model = AIModel()
+        if not model.train():
+            return False
+        self.swap_ai_model(model)
+        return True
+
+    def retrain_chat_model(self) -> bool:
+        """Обучает новую модель чата и подменяет ею текущую"""
+        from .chat_model import ChatModel
+        model = ChatModel()
+        if not model.train():
+            return False
+        self.swap_chat_model(model)
+        return True
+
+    def warm_up(self):
+        """Загружает обе модели и отмечает процесс готовым (ошибки загрузки не блокируют готовность)"""
+        started = time.monotonic()
+        try:
+            self.ai_model
+            self.chat_model
+            logger.info(f"Модели загружены за {time.monotonic() - started:.1f} с")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки моделей: {e}")
+        finally:
+            self.ready.set()
+
+registry = ModelRegistry()
@@ -0,0 +1,122 @@
+import numpy as np
+
+class InvertedIndex:
+    """Инвертированный индекс по TF-IDF: термин -> список (документ, вес).
+
+    Строки TF-IDF уже нормированы по L2, поэтому сумма произведений весов
+    по общим терминам - это косинус между запросом и документом. Считаются
+    только документы, у которых есть хотя бы один общий термин с запросом,
+    так что время поиска зависит от длины запроса и длины постингов, а не от
+    размера корпуса. Постинги хранятся плоскими массивами (как CSC-матрица).
+    """
+
+    def __init__(self, X):
+        csc = X.tocsc()
+        csc.sort_indices()
+        self.n_docs = X.shape[0]
+        self.indptr = csc.indptr.astype(np.int64)
+        self.doc_ids = csc.indices.astype(np.int32)
+        self.weights = csc.data.astype(np.float32)
+
+    def to_arrays(self) -> dict:
+        return {'indptr': self.indptr, 'doc_ids': self.doc_ids, 'weights': self.weights}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, n_docs: int):
+        """Индекс поверх готовых (в том числе отображенных в память) массивов"""
+        index = cls.__new__(cls)
+        index.n_docs = n_docs
+        index.indptr = arrays['indptr']
+        index.doc_ids = arrays['doc_ids']
+        index.weights = arrays['weights']
+        return index
+
+    def search(self, query, k: int = 1):
+        """Top-k документов для одной строки запроса: (ids, косинусы) по убыванию"""
+        ids, scores = [], []
+        for term, value in zip(query.indices, query.data):
+            start, end = self.indptr[term], self.indptr[term + 1]
+            if start == end:
+                continue
+            ids.append(self.doc_ids[start:end])
+            scores.append(self.weights[start:end] * value)
+        if not ids:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        ids = np.concatenate(ids)
+        scores = np.concatenate(scores)
+        docs, inverse = np.unique(ids, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+        if len(docs) > k:
+            top = np.argpartition(-totals, k - 1)[:k]
+        else:
+            top = np.arange(len(docs))
+        top = top[np.argsort(-totals[top], kind='stable')]
+        return docs[top], totals[top]
+
+    def search_batch(self, queries, k: int = 1):
+        """Поиск для каждой строки разреженной матрицы запросов"""
+        queries = queries.tocsr()
+        return [self.search(queries[i], k) for i in range(queries.shape[0])]
+
+class LSAIndex:
+    """Плотный индекс: TF-IDF, спроецированный усеченным SVD (LSA).
+
+    Вопросы хранятся одной непрерывной матрицей эмбеддингов ``float32`` или
+    ``float16`` с нормированными строками; поиск - одно матрично-векторное
+    произведение и ``argpartition``. В отличие от разреженного индекса
+    находит перефразировки без общих слов. ``float16`` вдвое экономит память,
+    но умножение в нем на CPU медленнее.
+    """
+
+    def __init__(self, X, n_components: int = 256, dtype: str = 'float32'):
+        from sklearn.decomposition import TruncatedSVD
+
+        # SVD требует число компонент меньше числа признаков
+        n_components = max(1, min(n_components, X.shape[0], X.shape[1] - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=42)
+        embeddings = svd.fit_transform(X)
+        self.n_docs = X.shape[0]
+        self.components = svd.components_.astype(np.float32)
+        self.embeddings = self._normalize(embeddings).astype(dtype)
+
+    def to_arrays(self) -> dict:
+        return {'components': self.components, 'embeddings': self.embeddings}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, n_docs: int):
+        """Индекс поверх готовых (в том числе отображенных в память) массивов"""
+        index = cls.__new__(cls)
+        index.n_docs = n_docs
+        index.components = arrays['components']
+        index.embeddings = arrays['embeddings']
+        return index
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed(self, queries):
+        """Эмбеддинги запросов (строки разреженной матрицы TF-IDF)"""
+        embedded = np.asarray(queries @ self.components.T, dtype=np.float32)
+        return self._normalize(embedded).astype(self.embeddings.dtype)
+
+    @staticmethod
+    def _top_k(scores, k: int):
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return top.astype(np.int32), scores[top].astype(np.float32)
+
+    def search(self, query, k: int = 1):
+        """Top-k документов для одной строки запроса: (ids, косинусы) по убыванию"""
+        return self.search_batch(query, k)[0]
+
+    def search_batch(self, queries, k: int = 1):
+        """Поиск для пачки запросов одним матричным произведением"""
+        scores = self.embed(queries) @ self.embeddings.T
+        return [self._top_k(row, k) for row in scores]
@@ -0,0 +1,265 @@
+import sqlite3
+import logging
+from pathlib import Path
+from .journal import BufferedStore, CorpusJournal
+
+logger = logging.getLogger(__name__)
+
+# Описание таблиц корпусов: столбцы текста, поиска и метки
+SCHEMAS = {
+    'training': {
+        'table': 'training_examples',
+        'create': (
+            "CREATE TABLE IF NOT EXISTS training_examples ("
+            "id INTEGER PRIMARY KEY, text TEXT NOT NULL, "
+            "text_norm TEXT NOT NULL UNIQUE, label TEXT NOT NULL)"
+        ),
+        'indexes': (
+            "CREATE INDEX IF NOT EXISTS idx_training_label ON training_examples(label)",
+        ),
+        # Базы, созданные до ограничения UNIQUE: индекс уникальности добавляется отдельно,
+        # а обычный индекс по text_norm становится лишним
+        'unique_column': 'text_norm',
+        'obsolete_indexes': ('idx_training_text_norm',),
+        'insert': "INSERT OR IGNORE INTO training_examples (text, text_norm, label) VALUES (?, ?, ?)",
+        'text_column': 'text',
+        'search_column': 'text_norm',
+        'label_column': 'label',
+    },
+    'chat': {
+        'table': 'chat_examples',
+        'create': (
+            "CREATE TABLE IF NOT EXISTS chat_examples ("
+            "id INTEGER PRIMARY KEY, question TEXT NOT NULL UNIQUE, answer TEXT NOT NULL)"
+        ),
+        'indexes': (
+            "CREATE INDEX IF NOT EXISTS idx_chat_answer ON chat_examples(answer)",
+        ),
+        'unique_column': 'question',
+        'insert': "INSERT OR IGNORE INTO chat_examples (question, answer) VALUES (?, ?)",
+        'text_column': 'question',
+        'search_column': 'question',
+        'label_column': 'answer',
+    },
+}
+
+def _to_row(kind: str, record: dict):
+    if kind == 'training':
+        return (record['text'], record['text'].lower(), record['label'])
+    return (record['question'], record['answer'])
+
+class SQLiteCorpusStore(BufferedStore):
+    """Хранилище корпуса в SQLite с индексами по нормализованному тексту и метке.
+
+    Корпус для обслуживания запросов по-прежнему держится в памяти (см.
+    ``models.corpus``), а поиск и постраничный просмотр для админов идут
+    прямо в базу: подстрока ищется через FTS5 с триграммным токенизатором,
+    метка - по индексу, страницы - по ключу ``id``. При первом запуске
+    таблица заполняется из JSON-снапшота и журнала.
+    """
+
+    def __init__(self, db_path, kind: str, snapshot_path, journal_path, flush_interval: float = 0.2):
+        super().__init__(f"sqlite-{kind}", flush_interval)
+        self.db_path = Path(db_path)
+        self.kind = kind
+        self.schema = SCHEMAS[kind]
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self._conn = None
+        self._fts = False
+        self._last_id = 0
+        self._data_version = None
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.schema['table']}_fts"
+
+    def _select(self, source: str = None) -> str:
+        """SELECT id, текст, метка из таблицы (или из ``source`` с псевдонимом e)"""
+        text, label = self.schema['text_column'], self.schema['label_column']
+        if source is None:
+            return f"SELECT id, {text}, {label} FROM {self.schema['table']}"
+        return f"SELECT e.id, e.{text}, e.{label} FROM {source}"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(self.schema['create'])
+        for statement in self.schema['indexes']:
+            conn.execute(statement)
+        self._fts = self._create_fts(conn)
+        self._ensure_unique(conn)
+        conn.commit()
+        self._conn = conn
+        if not conn.execute(f"SELECT 1 FROM {self.schema['table']} LIMIT 1").fetchone():
+            self._import_json()
+        return conn
+
+    def _create_fts(self, conn) -> bool:
+        """Создает триграммный FTS-индекс для поиска подстрок, если SQLite его поддерживает"""
+        table, column = self.schema['table'], self.schema['search_column']
+        fts = self.fts_table
+        existed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts,)).fetchone()
+        try:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{column}, content='{table}', content_rowid='id', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 trigram недоступен, поиск подстрок будет без индекса: {e}")
+            return False
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+        )
+        if not existed and conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+            # Индекс появился над уже заполненной таблицей (база создана без FTS5 или скопирована)
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            logger.info(f"FTS-индекс {fts} построен по существующим строкам")
+        return True
+
+    def _ensure_unique(self, conn):
+        """Уникальность нормализованного текста в базах старой схемы: повторы удаляются (остается первый)"""
+        table, column = self.schema['table'], self.schema['unique_column']
+        for _, name, unique, *_ in conn.execute(f"PRAGMA index_list({table})").fetchall():
+            columns = [row[2] for row in conn.execute(f"PRAGMA index_info({name})").fetchall()]
+            if unique and columns == [column]:
+                return
+        removed = conn.execute(
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {column})"
+        ).rowcount
+        for name in self.schema.get('obsolete_indexes', ()):
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_{column}_unique ON {table}({column})")
+        logger.info(f"Таблица {table}: добавлен уникальный индекс по {column}, удалено повторов: {removed}")
+
+    def _import_json(self):
+        """Переносит корпус из JSON-снапшота и журнала в пустую таблицу"""
+        empty = {"texts": [], "labels": []} if self.kind == 'training' else {}
+        journal = CorpusJournal(self.snapshot_path, self.journal_path, empty)
+        try:
+            snapshot, records = journal.load()
+        except Exception as e:
+            logger.error(f"Ошибка чтения JSON-корпуса для импорта: {e}")
+            return
+        if self.kind == 'training':
+            rows = [{"text": t, "label": l} for t, l in zip(snapshot.get('texts', []), snapshot.get('labels', []))]
+        else:
+            rows = [{"question": q, "answer": a} for q, a in snapshot.items() if isinstance(a, str)]
+        rows.extend(records)
+        if rows:
+            self._write(rows)
+            logger.info(f"В SQLite импортировано {len(rows)} примеров ({self.kind})")
+
+    def _write(self, batch):
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.schema['insert'], [_to_row(self.kind, record) for record in batch])
+
+    def _rows_to_records(self, rows):
+        if self.kind == 'training':
+            return [{"text": text, "label": label} for _, text, label in rows]
+        return [{"question": question, "answer": answer} for _, question, answer in rows]
+
+    def load(self):
+        """Читает весь корпус; возвращает (снапшот, записи) как ``CorpusJournal``"""
+        with self._io_lock:
+            conn = self._connect()
+            rows = conn.execute(f"{self._select()} ORDER BY id").fetchall()
+            self._last_id = rows[-1][0] if rows else 0
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self.kind == 'training':
+            snapshot = {"texts": [text for _, text, _ in rows], "labels": [label for _, _, label in rows]}
+        else:
+            snapshot = {question: answer for _, question, answer in rows}
+        return snapshot, []
+
+    def poll(self, wait: bool = False):
+        """Новые строки, закоммиченные другими соединениями после прошлого чтения.
+
+        Без ``wait`` не ждет, пока этот процесс пишет (например, массовый
+        импорт): чужие строки дочитаются в следующий раз.
+        """
+        if not self._io_lock.acquire(blocking=wait):
+            return []
+        try:
+            conn = self._connect()
+            # data_version меняется только от чужих коммитов - свои записи уже в памяти
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return []
+            self._data_version = version
+            rows = conn.execute(
+                f"{self._select()} WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+            if rows:
+                self._last_id = rows[-1][0]
+            return self._rows_to_records(rows)
+        finally:
+            self._io_lock.release()
+
+    def search(self, substring: str = None, label: str = None,
+               after_id: int = 0, before_id: int = None, limit: int = 10):
+        """Страница примеров (id, текст, метка) и признак наличия следующей страницы.
+
+        Страницы листаются по ключу: вперед - ``after_id``, назад - ``before_id``.
+        """
+        self.flush()
+        table, column = self.schema['table'], self.schema['search_column']
+        where, params = [], []
+        source = f"{table} AS e"
+        if substring:
+            substring = substring.lower()
+            if self._fts and len(substring) >= 3:
+                source = f"{self.fts_table} AS f JOIN {table} AS e ON e.id = f.rowid"
+                where.append(f"{self.fts_table} MATCH ?")
+                params.append('"' + substring.replace('"', '""') + '"')
+            else:
+                where.append(f"instr(e.{column}, ?) > 0")
+                params.append(substring)
+        if label:
+            where.append(f"e.{self.schema['label_column']} = ?")
+            params.append(label)
+        if before_id is not None:
+            where.append("e.id < ?")
+            params.append(before_id)
+            order = "DESC"
+        else:
+            where.append("e.id > ?")
+            params.append(after_id)
+            order = "ASC"
+
+        query = f"{self._select(source)} WHERE {' AND '.join(where)} ORDER BY e.id {order} LIMIT ?"
+        with self._io_lock:
+            rows = self._connect().execute(query, (*params, limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before_id is not None:
+            rows.reverse()
+        return rows, has_more
+
+    def count(self, label: str = None) -> int:
+        """Число примеров (всего или с заданной меткой) по индексу"""
+        self.flush()
+        query = f"SELECT COUNT(*) FROM {self.schema['table']}"
+        params = ()
+        if label:
+            query += f" WHERE {self.schema['label_column']} = ?"
+            params = (label,)
+        with self._io_lock:
+            return self._connect().execute(query, params).fetchone()[0]
+
+    def close(self):
+        super().close()
+        with self._io_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
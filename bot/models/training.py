@@ -0,0 +1,149 @@
+import asyncio
+import time
+import logging
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from core.config import config
+from core.metrics import training_duration
+from .registry import registry
+from .corpus import training_corpus, chat_corpus
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессной блокировки обучения нет
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def _train_ai_model() -> bool:
+    """Обучение модели вопрос-ответ (выполняется в дочернем процессе)"""
+    from .ai_model import AIModel
+    return AIModel().train()
+
+def _train_chat_model() -> bool:
+    """Обучение модели чата (выполняется в дочернем процессе)"""
+    from .chat_model import ChatModel
+    return ChatModel().train()
+
+def _lock_training(kind: str):
+    """Межпроцессная блокировка обучения модели (открытый файл) или None, если модель уже обучает другой процесс"""
+    path = Path(config.MODEL_PATH) / f"train-{kind}.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = open(path, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+    return lock
+
+class TrainingExecutor:
+    """Запускает обучение моделей в пуле процессов, не блокируя цикл событий.
+
+    Дочерний процесс обучает модель и сохраняет ее на диск, после чего
+    родительский процесс загружает результат и подменяет модель в реестре.
+    Повторный запуск обучения той же модели отклоняется, пока идет первый, -
+    в том числе из другого процесса supervisor.py (блокировка на файле в
+    ``MODEL_PATH`` держится от начала обучения до загрузки сохраненной
+    модели); задачи разных моделей ставятся в очередь пула.
+    """
+
+    JOBS = {
+        'ai': (_train_ai_model, registry.reload_ai_model, training_corpus),
+        'chat': (_train_chat_model, registry.reload_chat_model, chat_corpus),
+    }
+
+    def __init__(self, max_workers: int = 1):
+        self.max_workers = max_workers
+        self._pool = None
+        self._running = set()
+        self.last_duration = {}
+        self.on_trained = []  # Функции (kind), вызываемые после успешной подмены модели
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, а не fork: родитель держит потоки журналов и их блокировки
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def is_running(self, kind: str) -> bool:
+        """Проверяет, идет ли сейчас обучение модели (в этом или другом процессе)"""
+        if kind in self._running:
+            return True
+        lock = _lock_training(kind)
+        if lock is None:
+            return True
+        lock.close()
+        return False
+
+    async def train(self, kind: str, on_progress=None) -> bool:
+        """Обучает модель в пуле процессов.
+
+        ``on_progress`` - необязательная корутина, которая получает число
+        секунд с начала обучения и вызывается каждые
+        ``config.TRAINING_PROGRESS_INTERVAL`` секунд.
+        """
+        if kind in self._running:
+            logger.warning(f"Обучение '{kind}' уже выполняется, запрос отклонен")
+            return False
+
+        lock = _lock_training(kind)
+        if lock is None:
+            logger.warning(f"Обучение '{kind}' уже выполняется в другом процессе, запрос отклонен")
+            return False
+
+        job, reload_model, corpus = self.JOBS[kind]
+        self._running.add(kind)
+        started = time.monotonic()
+        try:
+            # Дочерний процесс читает корпус с диска - сбрасываем буфер журнала
+            await asyncio.to_thread(corpus.flush)
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_pool(), job)
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=config.TRAINING_PROGRESS_INTERVAL)
+                if done:
+                    break
+                if on_progress is not None:
+                    try:
+                        await on_progress(time.monotonic() - started)
+                    except Exception as e:
+                        logger.error(f"Ошибка отправки прогресса обучения: {e}")
+
+            if not future.result():
+                training_duration.observe(time.monotonic() - started, model=kind, status='failed')
+                return False
+            # Загрузка сохраненной модели тоже не должна блокировать цикл событий
+            if not await asyncio.to_thread(reload_model):
+                training_duration.observe(time.monotonic() - started, model=kind, status='failed')
+                return False
+            self.last_duration[kind] = time.monotonic() - started
+            training_duration.observe(self.last_duration[kind], model=kind, status='ok')
+            logger.info(f"Обучение '{kind}' завершено за {self.last_duration[kind]:.1f} с")
+            for listener in self.on_trained:
+                listener(kind)
+            return True
+        except BrokenProcessPool as e:
+            logger.error(f"Процесс обучения '{kind}' аварийно завершился: {e}")
+            self._pool = None
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка обучения '{kind}': {e}")
+            return False
+        finally:
+            self._running.discard(kind)
+            lock.close()
+
+    def shutdown(self):
+        """Останавливает пул процессов"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+trainer = TrainingExecutor(max_workers=config.TRAINING_WORKERS)
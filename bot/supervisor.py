@@ -0,0 +1,245 @@
+"""Запуск бота несколькими процессами-обработчиками.
+
+Супервизор получает обновления один раз (long polling или вебхук) и
+отправляет каждое в процесс ``chat_id % BOT_WORKERS``, поэтому сообщения
+одного чата всегда обрабатывает один процесс и по порядку. Каждый
+процесс загружает модели один раз при старте; упавший процесс
+перезапускается. После переобучения модели в одном процессе остальные
+перезагружают ее с диска, а после новых примеров инкрементальной модели
+дообучают ее ими. Одну модель обучает не больше одного процесса сразу
+(см. ``models.training``).
+
+Для сохранения состояний FSM при перезапуске процесса используйте
+``FSM_STORAGE=sqlite`` или ``redis``.
+"""
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+from aiohttp import web
+from core.config import config
+from core.logs import worker_log_queue
+
+logger = logging.getLogger("supervisor")
+
+def chat_id_of(update: dict) -> int:
+    """Чат, к которому относится обновление (пользователь или номер обновления, если чата нет)"""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        for source in (event, event.get("message") or {}):
+            chat = source.get("chat")
+            if isinstance(chat, dict) and "id" in chat:
+                return chat["id"]
+        user = event.get("from") or event.get("user")
+        if isinstance(user, dict) and "id" in user:
+            return user["id"]
+    return update.get("update_id", 0)
+
+def run_worker(index: int, inbox, events, log_queue):
+    """Точка входа процесса-обработчика"""
+    from core.logs import setup_logging
+    # До импорта bot: записи обработчика уходят в файл через супервизор
+    setup_logging(log_queue)
+    asyncio.run(_worker(index, inbox, events))
+
+async def _worker(index: int, inbox, events):
+    from aiogram.types import Update
+    from bot import build_dispatcher, create_bot
+    from core.outbox import outbox
+    from models.registry import registry
+    from models.training import trainer
+
+    bot = create_bot()
+    # Лимит отправки общий для бота - делим его между процессами
+    outbox.set_global_rate(config.OUTBOX_GLOBAL_RATE / config.BOT_WORKERS)
+    # Каждый процесс отдает свои метрики на METRICS_PORT + номер
+    dp = build_dispatcher(config.METRICS_PORT + index if config.METRICS_PORT else 0)
+    # Модели загружаются в фоне при старте диспетчера (см. bot.warm_up_models)
+    trainer.on_trained.append(lambda kind: events.put(("trained", kind, index)))
+    registry.on_examples_added.append(lambda kind: events.put(("added", kind, index)))
+    reloaders = {'ai': registry.reload_ai_model, 'chat': registry.reload_chat_model}
+    catch_ups = {'ai': registry.catch_up_ai_model}
+    logger.info(f"Обработчик {index} готов")
+
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+
+    def read_inbox():
+        # Блокирующее чтение межпроцессной очереди - в отдельном потоке
+        while True:
+            item = inbox.get()
+            loop.call_soon_threadsafe(messages.put_nowait, item)
+            if item is None:
+                return
+
+    threading.Thread(target=read_inbox, name=f"inbox-{index}", daemon=True).start()
+
+    tails = {}  # chat_id -> последняя задача чата: обновления одного чата идут строго по очереди
+
+    def forget(chat_id, task):
+        if tails.get(chat_id) is task:
+            del tails[chat_id]
+
+    async def process(previous, data):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await dp.feed_update(bot, Update.model_validate(data, context={"bot": bot}))
+        except Exception as e:
+            logger.error(f"Обработчик {index}: ошибка обновления {data.get('update_id')}: {e}")
+
+    await dp.emit_startup(bot=bot)
+    try:
+        while True:
+            item = await messages.get()
+            if item is None:
+                break
+            if item[0] == "update":
+                _, chat_id, data = item
+                task = asyncio.create_task(process(tails.get(chat_id), data))
+                tails[chat_id] = task
+                task.add_done_callback(lambda done, chat_id=chat_id: forget(chat_id, done))
+            elif item[0] == "reload":
+                await asyncio.to_thread(reloaders[item[1]])
+            elif item[0] == "catch_up":
+                await asyncio.to_thread(catch_ups[item[1]])
+        if tails:
+            await asyncio.gather(*tails.values(), return_exceptions=True)
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+        trainer.shutdown()
+
+class Supervisor:
+    """Держит пул процессов-обработчиков и раздает им обновления по ``chat_id``"""
+
+    def __init__(self, workers: int, queue_size: int = 10000):
+        self._context = multiprocessing.get_context("spawn")
+        self.workers = workers
+        self.inboxes = [self._context.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.events = self._context.Queue()
+        self.log_queue = worker_log_queue(self._context)
+        self.processes = [None] * workers
+        self.restarts = [0] * workers
+        self._stopping = False
+
+    def _start(self, index: int):
+        process = self._context.Process(
+            target=run_worker, args=(index, self.inboxes[index], self.events, self.log_queue),
+            name=f"bot-worker-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"Запущен обработчик {index} (pid {process.pid})")
+
+    def start(self):
+        for index in range(self.workers):
+            self._start(index)
+
+    async def route(self, update: dict):
+        """Отправляет обновление процессу его чата"""
+        chat_id = chat_id_of(update)
+        await self._put(self.inboxes[chat_id % self.workers], ("update", chat_id, update))
+
+    @staticmethod
+    async def _put(inbox, item):
+        try:
+            inbox.put_nowait(item)
+        except queue.Full:
+            # Обработчик не успевает - ждем места, не блокируя цикл событий
+            await asyncio.to_thread(inbox.put, item)
+
+    async def monitor(self):
+        """Перезапускает упавшие процессы и рассылает события о переобучении"""
+        while not self._stopping:
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self._stopping:
+                    self.restarts[index] += 1
+                    logger.error(f"Обработчик {index} завершился с кодом {process.exitcode}, перезапуск")
+                    self._start(index)
+            while True:
+                try:
+                    event, kind, source = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                # Переобученную модель остальные перезагружают, новые примеры инкрементальной - дообучают
+                command = {"trained": "reload", "added": "catch_up"}.get(event)
+                if command is not None:
+                    for index, inbox in enumerate(self.inboxes):
+                        if index != source:
+                            await self._put(inbox, (command, kind))
+            await asyncio.sleep(1)
+
+    def stop(self, timeout: float = 30):
+        """Просит обработчики доделать очередь и завершиться"""
+        self._stopping = True
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+
+async def poll_updates(bot, supervisor: Supervisor, allowed_updates):
+    """Long polling: получает обновления и раздает их обработчикам"""
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+        except Exception as e:
+            logger.error(f"Ошибка получения обновлений: {e}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            offset = update.update_id + 1
+            await supervisor.route(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+
+async def serve_webhook(bot, dp, supervisor: Supervisor):
+    """Вебхук: каждое принятое обновление сразу уходит обработчику"""
+    from core.webhook import WebhookServer
+
+    class ShardingWebhookServer(WebhookServer):
+        async def accept(self, data: dict) -> web.Response:
+            self.received += 1
+            await supervisor.route(data)
+            return web.Response()
+
+    server = ShardingWebhookServer(bot, dp, config.WEBHOOK_PATH, secret=config.WEBHOOK_SECRET)
+    runner = web.AppRunner(server.create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT, reuse_port=config.WEBHOOK_REUSE_PORT).start()
+    if config.WEBHOOK_URL:
+        await bot.set_webhook(url=config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH, secret_token=config.WEBHOOK_SECRET)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+async def main():
+    from bot import build_dispatcher, create_bot
+
+    config.ensure_directories()
+    bot = create_bot()
+    dp = build_dispatcher(metrics_port=0, warm_up=False, corpus_polling=False)
+    supervisor = Supervisor(config.BOT_WORKERS)
+    supervisor.start()
+    monitor = asyncio.create_task(supervisor.monitor())
+    try:
+        if config.BOT_MODE == "webhook":
+            await serve_webhook(bot, dp, supervisor)
+        else:
+            await bot.delete_webhook()
+            await poll_updates(bot, supervisor, dp.resolve_used_update_types())
+    finally:
+        monitor.cancel()
+        await asyncio.to_thread(supervisor.stop)
+        await bot.session.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass